@@ -1,25 +1,329 @@
-from sys import argv
-from . game import Chess
+from argparse import ArgumentParser, Namespace
+from sys import argv, exit, stderr, stdin, stdout
+import json
+import os
+from time import perf_counter
+from typing import List
+from . game import PROFILER, STARTING_FEN, Chess, Color, GameSummary
 
 
-def main():
+def print_summary(summary: GameSummary):
+    for number, move, msg in summary.errors:
+        print(" move {} rejected ({}): {}".format(number, move, msg))
+    if summary.done and summary.winner is None:
+        result = "draw, {}".format(summary.last_message)
+    elif summary.done:
+        result = "{} wins, {}".format(summary.winner.name, summary.last_message)
+    else:
+        result = "unfinished, {} to move".format("white" if summary.turn % 2 else "black")
+    print(" {} moves played, {} rejected, {}".format(summary.moves_played, len(summary.errors), result))
+
+
+def play(args: List[str]) -> int:
+    parser = ArgumentParser(prog="pychess", description="Play chess in the terminal.")
+    parser.add_argument("sleep_time", nargs="?", type=float, default=0,
+                        help="seconds to pause after each move")
+    parser.add_argument("--headless", action="store_true",
+                        help="read moves from stdin without drawing the board and print a summary")
+    parser.add_argument("--vs-engine", action="store_true", help="play against the computer")
+    parser.add_argument("--engine-color", choices=["white", "black"], default="black",
+                        help="side the computer plays")
+    parser.add_argument("--engine-time", type=float, default=1.0, help="seconds the computer thinks per move")
+    parser.add_argument("--engine-hash", type=float, default=16, help="transposition table size in MB")
+    parser.add_argument("--ponder", action="store_true",
+                        help="analyse the position while waiting for your move, so it is answered at once")
+    parser.add_argument("--book", help="Polyglot .bin opening book for the computer and the hint command")
+    parser.add_argument("--tablebase", help="directory of endgame tables made by pychess tablebase")
+    parser.add_argument("--fen", help="position to start from")
+    parser.add_argument("--game", help="file to resume the game from, if it exists, and to save it to on exit")
+    parser.add_argument("--profile", action="store_true",
+                        help="count and time the hot paths and print a summary at exit (works with every command, "
+                             "which then runs in one process)")
+    parser.add_argument("--profile-json", metavar="FILE", help="write the same counts and timings to FILE as JSON")
+    options = parser.parse_args(args)
+    game = Chess.from_fen(options.fen) if options.fen else Chess()
+    if options.game and os.path.isfile(options.game):
+        with open(options.game, "rb") as game_file:
+            game = Chess.from_snapshot(game_file.read())
+    try:
+        return play_game(game, options)
+    finally:
+        if options.game:
+            with open(options.game, "wb") as game_file:
+                game_file.write(game.to_snapshot())
+
+
+def profiled_processes(count: int, serial: int, option: str) -> int:
+    """The process count to use: work done in child processes isn't profiled, so under --profile
+    the command runs in this process instead."""
+    if not PROFILER.enabled or count <= serial:
+        return count
+    print(" --profile runs {} in this process, ignoring {} {}".format(option.split()[0], option, count), file=stderr)
+    return serial
+
+
+def play_game(game: Chess, options: Namespace) -> int:
+    if options.headless:
+        summary = game.play_moves(stdin)
+        print_summary(summary)
+        return 1 if summary.errors else 0
+    engine = book = tablebase = None
+    if options.book:
+        from . book import OpeningBook
+        book = OpeningBook(options.book)
+    if options.tablebase:
+        from . tablebase import Tablebase
+        tablebase = Tablebase(options.tablebase)
+    if options.vs_engine:
+        from . engine import Engine
+        engine = Engine(options.engine_time, hash_mb=options.engine_hash, book=book, tablebase=tablebase)
+    engine_color = Color.WHITE if options.engine_color == "white" else Color.BLACK
+    game.start(options.sleep_time, engine, engine_color, book, tablebase, options.ponder)
+    return 0
+
+
+def analyze(args: List[str]) -> int:
+    from itertools import islice
+    from . analyze import ColumnWriter, analyze_positions, numpy
+    parser = ArgumentParser(prog="pychess analyze",
+                            description="Score every position of an EPD or FEN file: legal moves, check, mate and "
+                                        "static evaluation (white's point of view), one JSON line each.")
+    parser.add_argument("path", help="file with one EPD record or FEN per line")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=256, help="positions sent to a worker at a time")
+    parser.add_argument("--output", help="write here instead of stdout")
+    parser.add_argument("--columns", action="store_true",
+                        help="write a binary columnar file (needs --output, see pychess.analyze.read_columns)")
+    options = parser.parse_args(args)
+    if options.columns and not options.output:
+        raise ValueError("--columns needs --output")
+    start, positions, invalid = perf_counter(), 0, 0
+    out = open(options.output, "wb" if options.columns else "w") if options.output else stdout
     try:
-        # TODO: use argparse
-        sleep_time = 0
-        if len(argv) > 2:
-            print("Usage: pychess [sleep_time]")
+        with open(options.path) as lines:
+            jobs = profiled_processes(options.jobs, 1, "analyze --jobs")
+            results = analyze_positions(lines, jobs, options.chunk_size)
+            writer = ColumnWriter(out) if options.columns else None
+            for batch in iter(lambda: list(islice(results, options.chunk_size)), []):
+                if writer is not None:
+                    writer.write(batch)
+                else:
+                    out.write("".join(json.dumps(result) + "\n" for result in batch))
+                positions, invalid = positions + len(batch), invalid + sum("error" in result for result in batch)
+    finally:
+        if options.output:
+            out.close()
+    elapsed = perf_counter() - start
+    print(" {} positions in {:.2f}s, {:.0f} positions/s, {} invalid, {} evaluation".format(
+        positions, elapsed, positions / max(elapsed, 1e-9), invalid, "NumPy" if numpy is not None else "pure Python"),
+        file=stderr)
+    return 1 if invalid else 0
+
+
+def bench(args: List[str]) -> int:
+    from . bench import DEFAULT_GAMES, load_baseline, regressions, run_bench, save_baseline
+    parser = ArgumentParser(prog="pychess bench",
+                            description="Time self-play games end to end through parse_move and move.")
+    parser.add_argument("--games", type=int, default=DEFAULT_GAMES, help="games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first random game")
+    parser.add_argument("--engine-depth", type=int, help="let the engine pick moves at this depth instead of at random")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--baseline", help="fail if throughput is more than --tolerance below this saved report")
+    parser.add_argument("--tolerance", type=float, default=10, help="allowed drop below the baseline in percent")
+    parser.add_argument("--save-baseline", metavar="FILE", help="save the report as a baseline")
+    options = parser.parse_args(args)
+    report = run_bench(options.games, options.seed, options.engine_depth)
+    if options.json:
+        print(json.dumps(report.to_dict()))
+    else:
+        print(" {} games, {} moves in {:.2f}s: {:.1f} games/s, {:.0f} moves/s".format(
+            report.games, report.moves, report.elapsed, report.games_per_second, report.moves_per_second))
+        print(" parse_move mean {:.1f}us, p99 {:.1f}us, peak RSS {} KB".format(
+            1e6 * report.mean_parse, 1e6 * report.percentile(0.99),
+            "?" if report.peak_rss_kb is None else report.peak_rss_kb))
+    if options.save_baseline:
+        save_baseline(report, options.save_baseline)
+    failures = regressions(report, load_baseline(options.baseline), options.tolerance) if options.baseline else []
+    for failure in failures:
+        print(" regression: " + failure, file=stderr)
+    return 1 if failures else 0
+
+
+def perft(args: List[str]) -> int:
+    from . perft import divide, perft as count_nodes, run_suite
+    parser = ArgumentParser(prog="pychess perft", description="Count move generator leaf nodes.")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to start from")
+    parser.add_argument("--depth", type=int, default=None, help="depth to search to")
+    parser.add_argument("--divide", action="store_true", help="break the count down per root move")
+    parser.add_argument("--suite", action="store_true", help="run the standard positions with known counts")
+    parser.add_argument("--max-nodes", type=int, default=100000,
+                        help="skip suite depths with more leaf nodes than this")
+    options = parser.parse_args(args)
+    if options.suite:
+        return 0 if run_suite(options.depth, options.max_nodes) else 1
+
+    game, depth = Chess.from_fen(options.fen), 3 if options.depth is None else options.depth
+    start = perf_counter()
+    if options.divide:
+        results = divide(game, depth)
+        for move, nodes in sorted(results.items()):
+            print(" {}: {}".format(move, nodes))
+        nodes = sum(results.values())
+    else:
+        nodes = count_nodes(game, depth)
+    elapsed = perf_counter() - start
+    print(" depth {} {} nodes in {:.2f}s, {:.0f} nodes/s".format(depth, nodes, elapsed, nodes / max(elapsed, 1e-9)))
+    return 0
+
+
+def validate(args: List[str]) -> int:
+    from . validate import find_games, validate_games
+    parser = ArgumentParser(prog="pychess validate",
+                            description="Replay move-list files or PGN databases and report each game as a JSON line.")
+    parser.add_argument("path", help="directory of games or glob pattern, .pgn files may hold many games")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=16, help="games sent to a worker at a time")
+    options = parser.parse_args(args)
+    paths = find_games(options.path)
+    start, games, illegal, errors = perf_counter(), 0, 0, 0
+    jobs = profiled_processes(options.jobs, 1, "validate --jobs")
+    for result in validate_games(paths, jobs, options.chunk_size):
+        print(json.dumps(result), flush=True)
+        games, errors = games + 1, errors + ("error" in result)
+        illegal += result.get("illegal_move") is not None
+    elapsed = perf_counter() - start
+    print(" {} games in {:.2f}s, {:.1f} games/s, {} with illegal moves, {} unreadable".format(
+        games, elapsed, games / max(elapsed, 1e-9), illegal, errors), file=stderr)
+    return 1 if illegal or errors else 0
+
+
+def search(args: List[str]) -> int:
+    from . engine import Engine
+    from . parallel import ParallelEngine, benchmark
+    parser = ArgumentParser(prog="pychess search", description="Search a position for the best move.")
+    parser.add_argument("--fen", default=STARTING_FEN, help="position to search")
+    parser.add_argument("--time", type=float, default=5.0, help="seconds to search for")
+    parser.add_argument("--depth", type=int, default=64, help="maximum depth")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes, 1 searches in this process")
+    parser.add_argument("--hash", type=float, default=16, help="transposition table size in MB per process")
+    parser.add_argument("--benchmark", type=int, nargs="*", metavar="WORKERS",
+                        help="time a --depth search at each worker count (default 1 2 4 8) and report the speedup "
+                             "over the serial engine")
+    options = parser.parse_args(args)
+    if options.benchmark is not None:
+        depth = 4 if options.depth == 64 else options.depth
+        for workers, elapsed, nodes, speedup in benchmark(options.fen, depth, options.benchmark or [1, 2, 4, 8]):
+            print(" {}: depth {} {} nodes in {:.2f}s, {:.2f}x".format(
+                "{} workers".format(workers) if workers else "serial", depth, nodes, elapsed, speedup))
+        return 0
+    game = Chess.from_fen(options.fen)
+    workers = profiled_processes(options.workers, 1, "search --workers")
+    if workers > 1:
+        with ParallelEngine(workers, options.time, options.depth, options.hash) as engine:
+            result, table = engine.search(game), engine.engine.table
+    else:
+        engine = Engine(options.time, options.depth, options.hash)
+        result, table = engine.search(game), engine.table
+    if result.move is None:
+        print(" no legal moves")
+        return 0
+    print(" best move {} score {} depth {} {} nodes in {:.2f}s, {:.0f} nodes/s".format(
+        game.san(*result.move), result.score, result.depth, result.nodes, result.elapsed, result.nodes_per_second))
+    if table is not None:
+        print(" transposition table: " + table.stats())
+    return 0
+
+
+def tablebase(args: List[str]) -> int:
+    from . tablebase import MATERIALS, Tablebase, generate_tables
+    parser = ArgumentParser(prog="pychess tablebase",
+                            description="Generate endgame tables by retrograde analysis, or probe them.")
+    parser.add_argument("directory", help="where the tables are written and read")
+    parser.add_argument("--materials", nargs="+", choices=list(MATERIALS), help="endings to generate (default all)")
+    parser.add_argument("--fen", help="probe this position instead of generating")
+    options = parser.parse_args(args)
+    if options.fen is None:
+        generate_tables(options.directory, options.materials)
+        return 0
+    game = Chess.from_fen(options.fen)
+    with Tablebase(options.directory) as tables:
+        result = tables.probe(game)
+        if result is None:
+            print(" position not in the tables")
             return 1
-        elif len(argv) == 2:
-            try:
-                sleep_time = float(argv[1])
-            except ValueError:
-                print("Usage: pychess [sleep_time]")
-                return 1
-        game = Chess()
-        game.start(sleep_time)
+        move = tables.best_move(game)
+        verdict = "draw" if not result.wdl else "{} in {} plies".format(
+            "win" if result.wdl > 0 else "loss", result.distance)
+        print(" {} for the side to move{}".format(verdict, ", best move " + game.san(*move) if move else ""))
+    return 0
+
+
+def serve(args: List[str]) -> int:
+    import asyncio
+    from . server import DEFAULT_PORT, serve_forever
+    parser = ArgumentParser(prog="pychess serve", description="Host games over TCP, one game per connection.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes that check moves, 0 checks them on the event loop")
+    options = parser.parse_args(args)
+    asyncio.run(serve_forever(options.host, options.port, profiled_processes(options.workers, 0, "serve --workers")))
+    return 0
+
+
+def load(args: List[str]) -> int:
+    import asyncio
+    from . server import DEFAULT_PORT, load_test
+    parser = ArgumentParser(prog="pychess load", description="Play random games against pychess serve.")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="server port")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--games", type=int, default=2, help="games each connection plays")
+    options = parser.parse_args(args)
+    report = asyncio.run(load_test(options.host, options.port, options.clients, options.games))
+    print(" {} moves in {:.2f}s, {:.0f} moves/s, p50 {:.1f}ms, p99 {:.1f}ms, {} rejected".format(
+        report.moves, report.elapsed, report.moves_per_second, 1000 * report.percentile(0.5),
+        1000 * report.percentile(0.99), report.errors))
+    return 1 if report.errors else 0
+
+
+COMMANDS = {
+    "analyze": analyze,
+    "bench": bench,
+    "load": load,
+    "perft": perft,
+    "search": search,
+    "serve": serve,
+    "tablebase": tablebase,
+    "validate": validate,
+}
+
+
+def main():
+    # --profile and --profile-json work with every command, so they're taken out before dispatching;
+    # the counts are only kept in this process, see profiled_processes
+    profile_parser = ArgumentParser(add_help=False)
+    profile_parser.add_argument("--profile", action="store_true")
+    profile_parser.add_argument("--profile-json")
+    profile_options, args = profile_parser.parse_known_args(argv[1:])
+    if profile_options.profile or profile_options.profile_json:
+        PROFILER.enable()
+    try:
+        if args and args[0] in COMMANDS:
+            return COMMANDS[args[0]](args[1:])
+        return play(args)
+    except ValueError as error:
+        print(" " + str(error))
+        return 1
     except (EOFError, KeyboardInterrupt):
         print("\n Quitting...")
+    finally:
+        if profile_options.profile:
+            print(PROFILER.summary(), file=stderr)
+        if profile_options.profile_json:
+            with open(profile_options.profile_json, "w") as profile_file:
+                json.dump(Chess.stats(), profile_file, indent=2)
 
 
 if __name__ == "__main__":
-    main()
+    exit(main())
@@ -0,0 +1,142 @@
+from array import array
+from itertools import islice
+from struct import Struct
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import re
+import sys
+
+from . engine import PIECE_SQUARE_SCORES
+from . game import BLACK_BIT, KING, PAWN, SQUARES, WHITE_BIT, Chess
+from . validate import map_chunks
+
+try:
+    import numpy
+except ImportError:  # optional, pip install terminal-chess[analyze]
+    numpy = None
+
+# piece planes in the order white pawn..king then black pawn..king, squares rank 8 first
+PLANE_CODES = [kind | bit for bit in [WHITE_BIT, BLACK_BIT] for kind in range(PAWN, KING + 1)]
+SQUARE_SCORES = [[PIECE_SQUARE_SCORES[code][index] for index in SQUARES] for code in range(16)]
+PLANE_WEIGHTS = numpy.array([SQUARE_SCORES[code] for code in PLANE_CODES], dtype=numpy.int32).reshape(-1) \
+    if numpy is not None else None
+
+CHECK, CHECKMATE, STALEMATE, INVALID = 1, 2, 4, 8
+STATUSES = {0: "ongoing", CHECKMATE: "checkmate", STALEMATE: "stalemate"}
+EPD_ID = re.compile(r'\bid\s+"([^"]*)"')
+
+COLUMNS_MAGIC, COLUMNS_VERSION = b"PYAN", 1
+COLUMNS_HEADER = Struct("<4sB")
+BLOCK_HEADER = Struct("<I")
+# column name, array typecode; each block holds every column for the positions of one chunk
+COLUMNS = [("line", "I"), ("moves", "H"), ("flags", "B"), ("eval", "i")]
+
+
+def read_positions(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """(line number, line) of every position in an EPD or FEN file, skipping blanks and comments."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield number, line
+
+
+def parse_position(line: str) -> Tuple[Chess, Optional[str]]:
+    """A FEN, or an EPD record (four FEN fields then operations), with its EPD id if it has one."""
+    fields = line.split()
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        return Chess.from_fen(" ".join(fields[:6])), None
+    match = EPD_ID.search(line)
+    return Chess.from_fen(" ".join(fields[:4])), match.group(1) if match else None
+
+
+def piece_planes(codes: bytes) -> "numpy.ndarray":
+    """12x64 boolean piece planes of positions given as 64 piece codes each."""
+    boards = numpy.frombuffer(codes, dtype=numpy.uint8).reshape(len(codes) // 64, 64)
+    return boards[:, None, :] == numpy.array(PLANE_CODES, dtype=numpy.uint8)[None, :, None]
+
+
+def evaluate_codes(codes: bytes) -> List[int]:
+    """Material and piece-square scores from white's point of view (the engine's evaluation) of
+    positions given as 64 piece codes each, the whole chunk at once when NumPy is there."""
+    if numpy is not None:
+        planes = piece_planes(codes)
+        return (planes.reshape(len(planes), PLANE_WEIGHTS.size).astype(numpy.int32) @ PLANE_WEIGHTS).tolist()
+    return [sum(SQUARE_SCORES[code][square] for square, code in enumerate(codes[start:start + 64]) if code)
+            for start in range(0, len(codes), 64)]
+
+
+def analyze_position(game: Chess) -> Tuple[int, int]:
+    """Legal move count and flags of a position."""
+    color = game.player_color()
+    moves = sum(1 for _ in game.move_generator.get_moves_with_promotions(color))
+    flags = CHECK if game.is_check(color) else 0
+    if not moves:
+        flags |= CHECKMATE if flags else STALEMATE
+    return moves, flags
+
+
+def analyze_chunk(chunk: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+    results, codes = [], bytearray()
+    for number, line in chunk:
+        try:
+            game, label = parse_position(line)
+        except ValueError as error:
+            results.append({"line": number, "error": str(error)})
+            continue
+        moves, flags = analyze_position(game)
+        results.append({"line": number, "id": label, "moves": moves, "check": bool(flags & CHECK),
+                        "status": STATUSES[flags & ~CHECK], "flags": flags})
+        codes += bytes(game.board.squares[index] for index in SQUARES)
+    scores = iter(evaluate_codes(bytes(codes)))
+    for result in results:
+        if "error" not in result:
+            result["eval"] = next(scores)
+    return results
+
+
+def analyze_positions(lines: Iterable[str], jobs: int = 1, chunk_size: int = 256) -> Iterator[Dict[str, Any]]:
+    """Analyse the positions of an EPD or FEN stream across a process pool, yielding results as
+    chunks complete (not in input order; each result carries its line number)."""
+    positions = read_positions(lines)
+    return map_chunks(analyze_chunk, iter(lambda: list(islice(positions, chunk_size)), []), jobs)
+
+
+class ColumnWriter:
+    """Binary columnar results: a header, then one block per batch of results with each column
+    stored contiguously (see COLUMNS). Invalid positions are kept with the INVALID flag."""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        out.write(COLUMNS_HEADER.pack(COLUMNS_MAGIC, COLUMNS_VERSION))
+
+    def write(self, results: List[Dict[str, Any]]):
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        for result in results:
+            columns["line"].append(result["line"])
+            columns["moves"].append(result.get("moves", 0))
+            columns["flags"].append(result.get("flags", INVALID))
+            columns["eval"].append(result.get("eval", 0))
+        self.out.write(BLOCK_HEADER.pack(len(results)))
+        for column in columns.values():
+            if sys.byteorder == "big":
+                column.byteswap()
+            self.out.write(column.tobytes())
+
+
+def read_columns(data: bytes) -> Iterator[Dict[str, array]]:
+    """The blocks of a ColumnWriter file."""
+    magic, version = COLUMNS_HEADER.unpack_from(data)
+    if magic != COLUMNS_MAGIC or version != COLUMNS_VERSION:
+        raise ValueError("not a pychess analysis file")
+    offset = COLUMNS_HEADER.size
+    while offset < len(data):
+        (count,) = BLOCK_HEADER.unpack_from(data, offset)
+        offset += BLOCK_HEADER.size
+        block = {}
+        for name, typecode in COLUMNS:
+            column = array(typecode)
+            column.frombytes(data[offset:offset + count * column.itemsize])
+            if sys.byteorder == "big":
+                column.byteswap()
+            block[name] = column
+            offset += count * column.itemsize
+        yield block
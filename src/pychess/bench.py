@@ -0,0 +1,130 @@
+from random import Random
+from time import perf_counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import json
+import sys
+
+from . game import Chess
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+DEFAULT_GAMES = 20
+MAX_PLIES = 500
+GATED_METRICS = ["games_per_second", "moves_per_second"]
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KB, None where the platform doesn't say."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class BenchReport(NamedTuple):
+    games: int
+    moves: int
+    elapsed: float
+    parse_latencies: List[float]
+    peak_rss_kb: Optional[int]
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / max(self.elapsed, 1e-9)
+
+    @property
+    def moves_per_second(self) -> float:
+        return self.moves / max(self.elapsed, 1e-9)
+
+    @property
+    def mean_parse(self) -> float:
+        return sum(self.parse_latencies) / len(self.parse_latencies) if self.parse_latencies else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        if not self.parse_latencies:
+            return 0.0
+        ordered = sorted(self.parse_latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "games": self.games,
+            "moves": self.moves,
+            "elapsed": self.elapsed,
+            "games_per_second": self.games_per_second,
+            "moves_per_second": self.moves_per_second,
+            "mean_parse_us": 1e6 * self.mean_parse,
+            "p99_parse_us": 1e6 * self.percentile(0.99),
+            "peak_rss_kb": self.peak_rss_kb,
+        }
+
+
+def self_play(seed: int, engine=None, latencies: Optional[List[float]] = None) -> Tuple[int, float]:
+    """Play one game from the start position, each move written in SAN and played back through
+    parse_move and play_parsed like typed input. Moves are picked at random from seed, or by engine.
+    Returns the moves played and the seconds spent; parse_move timings go into latencies."""
+    game, random = Chess(), Random(seed)
+    latencies = [] if latencies is None else latencies
+    played, elapsed = 0, 0.0
+    while not game.done and played < MAX_PLIES:
+        # choosing the move is the player's time, not the game's, so it stays off the clock
+        if engine is not None:
+            choice = engine.search(game).move
+        else:
+            legal = list(game.move_generator.get_moves_with_promotions(game.player_color()))
+            choice = random.choice(legal) if legal else None
+        if choice is None:
+            break
+        san = game.san(*choice)
+        start = perf_counter()
+        parsed = game.parse_move(san)
+        parse_end = perf_counter()
+        if not parsed[0]:
+            raise AssertionError("self-play move {} was rejected: {}".format(san, parsed[1]))
+        game.play_parsed(parsed)
+        latencies.append(parse_end - start)
+        elapsed += perf_counter() - start
+        played += 1
+    return played, elapsed
+
+
+def run_bench(games: int = DEFAULT_GAMES, seed: int = 0, engine_depth: Optional[int] = None) -> BenchReport:
+    """Self-play games seeded seed, seed + 1, ...; with engine_depth the engine picks the moves at
+    that fixed depth instead of random choice."""
+    engine = None
+    if engine_depth is not None:
+        from . engine import Engine
+        engine = Engine(float("inf"), engine_depth, hash_mb=1)
+    latencies: List[float] = []
+    moves, elapsed = 0, 0.0
+    for number in range(games):
+        played, seconds = self_play(seed + number, engine, latencies)
+        moves, elapsed = moves + played, elapsed + seconds
+    return BenchReport(games, moves, elapsed, latencies, peak_rss_kb())
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(report: BenchReport, path: str):
+    with open(path, "w") as baseline_file:
+        json.dump(report.to_dict(), baseline_file, indent=2)
+        baseline_file.write("\n")
+
+
+def regressions(report: BenchReport, baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """The gated throughput figures that fell more than tolerance percent below the baseline."""
+    results = report.to_dict()
+    failures = []
+    for metric in GATED_METRICS:
+        if metric not in baseline:
+            continue
+        if results[metric] < baseline[metric] * (1 - tolerance / 100):
+            failures.append("{} {:.1f} is more than {:g}% below the baseline {:.1f}".format(
+                metric, results[metric], tolerance, baseline[metric]))
+    return failures
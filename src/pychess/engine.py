@@ -0,0 +1,264 @@
+from threading import Event
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Tuple
+
+from . game import BISHOP, BLACK_BIT, KING, KNIGHT, PAWN, QUEEN, ROOK, SQUARES, Chess, coord_to_index
+from . transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+PIECE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, ROOK: 500, QUEEN: 900, KING: 0}
+
+# piece-square bonuses from white's side of the board, rank 8 first like the board coordinates
+PAWN_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5, 5, 10, 25, 25, 10, 5, 5,
+    0, 0, 0, 20, 20, 0, 0, 0,
+    5, -5, -10, 0, 0, -10, -5, 5,
+    5, 10, 10, -20, -20, 10, 10, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+KNIGHT_TABLE = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20, 0, 0, 0, 0, -20, -40,
+    -30, 0, 10, 15, 15, 10, 0, -30,
+    -30, 5, 15, 20, 20, 15, 5, -30,
+    -30, 0, 15, 20, 20, 15, 0, -30,
+    -30, 5, 10, 15, 15, 10, 5, -30,
+    -40, -20, 0, 5, 5, 0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+BISHOP_TABLE = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10, 0, 0, 0, 0, 0, 0, -10,
+    -10, 0, 5, 10, 10, 5, 0, -10,
+    -10, 5, 5, 10, 10, 5, 5, -10,
+    -10, 0, 10, 10, 10, 10, 0, -10,
+    -10, 10, 10, 10, 10, 10, 10, -10,
+    -10, 5, 0, 0, 0, 0, 5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+ROOK_TABLE = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    5, 10, 10, 10, 10, 10, 10, 5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    -5, 0, 0, 0, 0, 0, 0, -5,
+    0, 0, 0, 5, 5, 0, 0, 0,
+]
+KING_TABLE = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+    20, 20, 0, 0, 0, 0, 20, 20,
+    20, 30, 10, 0, 0, 10, 30, 20,
+]
+PIECE_TABLES = {PAWN: PAWN_TABLE, KNIGHT: KNIGHT_TABLE, BISHOP: BISHOP_TABLE, ROOK: ROOK_TABLE,
+                QUEEN: [0] * 64, KING: KING_TABLE}
+
+# per piece code, the score of that piece on each 0x88 index from white's point of view
+PIECE_SQUARE_SCORES = [[0] * 128 for _ in range(16)]
+for _kind, _table in PIECE_TABLES.items():
+    for _index in SQUARES:
+        _rank, _file = _index >> 4, _index & 7
+        PIECE_SQUARE_SCORES[_kind][_index] = PIECE_VALUES[_kind] + _table[_rank * 8 + _file]
+        PIECE_SQUARE_SCORES[_kind | BLACK_BIT][_index] = -PIECE_VALUES[_kind] - _table[(7 - _rank) * 8 + _file]
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchResult(NamedTuple):
+    move: Optional[Tuple]
+    score: int
+    depth: int
+    nodes: int
+    elapsed: float
+    source: str = "search"  # or "book" and "tablebase" for moves played without searching
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / max(self.elapsed, 1e-9)
+
+
+def evaluate(game: Chess) -> int:
+    """Material and piece-square score from the point of view of the side to move."""
+    squares = game.board.squares
+    score = sum(PIECE_SQUARE_SCORES[squares[index]][index] for index in SQUARES if squares[index])
+    return score if game.player_turn() else -score
+
+
+def capture_value(game: Chess, move: Tuple) -> int:
+    """MVV-LVA ordering key: most valuable victim first, then least valuable attacker."""
+    squares = game.board.squares
+    start_index, end_index = coord_to_index(move[0]), coord_to_index(move[1])
+    attacker = squares[start_index] & ~BLACK_BIT
+    victim = squares[end_index] & ~BLACK_BIT
+    if not victim and attacker == PAWN and (end_index - start_index) % 16:
+        victim = PAWN
+    promotion = PIECE_VALUES[QUEEN] if move[2] is not None and move[2].kind == QUEEN else 0
+    if not victim:
+        return promotion
+    return 10 * PIECE_VALUES[victim] - PIECE_VALUES[attacker] + promotion + 1
+
+
+def score_to_table(score: int, ply: int) -> int:
+    """Mate scores are stored relative to the position rather than the root."""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class Engine:
+    """Negamax alpha-beta with iterative deepening, capture quiescence and MVV-LVA ordering,
+    stopping once time_budget seconds have passed. Results are kept in a transposition table of
+    hash_mb megabytes (none when 0) that persists between searches. With an opening book (see
+    pychess.book.OpeningBook) book moves are played without searching, as are endgame tablebase
+    moves (see pychess.tablebase.Tablebase)."""
+
+    def __init__(self, time_budget: float = 1.0, max_depth: int = 64, hash_mb: float = 16, book=None,
+                 tablebase=None):
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.book = book
+        self.tablebase = tablebase
+        self.table = TranspositionTable(hash_mb) if hash_mb else None
+        self.nodes = 0
+        self.deadline = 0.0
+        self.stopping = Event()
+
+    def ordered_moves(self, game: Chess, best_move: Optional[Tuple] = None) -> List[Tuple]:
+        moves = list(game.move_generator.get_moves_with_promotions(game.player_color()))
+        moves.sort(key=lambda move: capture_value(game, move), reverse=True)
+        if best_move in moves:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+        return moves
+
+    def stop(self):
+        """Stop a search running in another thread early; it still returns its deepest completed
+        iteration. Searches stay stopped until resume is called."""
+        self.stopping.set()
+
+    def resume(self):
+        self.stopping.clear()
+
+    def _count_node(self):
+        self.nodes += 1
+        if not self.nodes & 1023 and (perf_counter() > self.deadline or self.stopping.is_set()):
+            raise SearchTimeout()
+
+    def quiescence(self, game: Chess, alpha: int, beta: int) -> int:
+        self._count_node()
+        stand_pat = evaluate(game)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        for move in self.ordered_moves(game):
+            if capture_value(game, move) <= 0:
+                break
+            game.make_move(*move)
+            try:
+                score = -self.quiescence(game, -beta, -alpha)
+            finally:
+                game.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def negamax(self, game: Chess, depth: int, alpha: int, beta: int, ply: int) -> int:
+        # a position seen before on the way here (or in the game) is scored as the draw it can become
+        if game.halfmove_clock >= 100 or game.position_counts[game.zobrist_key] > 1:
+            return 0
+        if depth <= 0:
+            return self.quiescence(game, alpha, beta)
+        self._count_node()
+        original_alpha, table_move = alpha, None
+        entry = self.table.probe(game.zobrist_key) if self.table is not None else None
+        if entry is not None:
+            table_move = entry.move
+            score = score_from_table(entry.score, ply)
+            if entry.depth >= depth and (entry.bound == EXACT or entry.bound == LOWER_BOUND and score >= beta
+                                         or entry.bound == UPPER_BOUND and score <= alpha):
+                return score
+        moves = self.ordered_moves(game, table_move)
+        if not moves:
+            return -MATE_SCORE + ply if game.is_check(game.player_color()) else 0
+        best_score, best_move = -MATE_SCORE, None
+        for move in moves:
+            game.make_move(*move)
+            try:
+                score = -self.negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.unmake_move()
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+        if self.table is not None:
+            bound = UPPER_BOUND if best_score <= original_alpha else LOWER_BOUND if best_score >= beta else EXACT
+            self.table.store(game.zobrist_key, depth, score_to_table(best_score, ply), bound, best_move)
+        return best_score
+
+    def search_root(self, game: Chess, depth: int, best_move: Optional[Tuple]) -> Tuple[Optional[Tuple], int]:
+        alpha, beta, root_best = -MATE_SCORE - 1, MATE_SCORE + 1, None
+        for move in self.ordered_moves(game, best_move):
+            game.make_move(*move)
+            try:
+                score = -self.negamax(game, depth - 1, -beta, -alpha, 1)
+            finally:
+                game.unmake_move()
+            if score > alpha:
+                alpha, root_best = score, move
+        if self.table is not None:
+            self.table.store(game.zobrist_key, depth, score_to_table(alpha, 0), EXACT, root_best)
+        return root_best, alpha
+
+    def search(self, game: Chess, time_budget: Optional[float] = None) -> SearchResult:
+        """Search deeper and deeper until the time budget runs out (time_budget overrides the
+        engine's own), returning the best move of the deepest completed iteration (move is None when
+        there are no legal moves). Book and tablebase moves come back with depth 0."""
+        start = perf_counter()
+        self.nodes, self.deadline = 0, start + (self.time_budget if time_budget is None else time_budget)
+        book_move = self.book.choose(game) if self.book is not None else None
+        if book_move is not None:
+            return SearchResult(book_move, 0, 0, 0, perf_counter() - start, "book")
+        known = self.tablebase.probe(game) if self.tablebase is not None else None
+        tablebase_move = self.tablebase.best_move(game) if known is not None else None
+        if tablebase_move is not None:
+            score = known.wdl * (MATE_SCORE - known.distance)
+            return SearchResult(tablebase_move, score, 0, 0, perf_counter() - start, "tablebase")
+        entry = self.table.probe(game.zobrist_key) if self.table is not None else None
+        moves = self.ordered_moves(game, entry.move if entry is not None else None)
+        best_move, best_score, depth_reached = (moves[0] if moves else None), 0, 0
+        if len(moves) > 1:
+            try:
+                for depth in range(1, self.max_depth + 1):
+                    best_move, best_score = self.search_root(game, depth, best_move)
+                    depth_reached = depth
+                    if abs(best_score) >= MATE_SCORE - self.max_depth:
+                        break
+            except SearchTimeout:
+                pass
+        return SearchResult(best_move, best_score, depth_reached, self.nodes, perf_counter() - start)
@@ -1,9 +1,17 @@
+from array import array
 from copy import deepcopy
 from enum import Enum, auto
+from functools import reduce, wraps
+from inspect import isgeneratorfunction
 from itertools import chain
-from time import sleep
+from operator import xor
+from random import Random
+from struct import Struct
+from threading import Event, Thread
+from time import perf_counter, sleep
 from types import LambdaType
-from typing import Any, Dict, Generator, Iterable, Tuple
+from typing import Dict, Generator, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+import sys
 
 
 class Color(Enum):
@@ -26,13 +34,24 @@ class Color(Enum):
         return self
 
 
+EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(7)
+WHITE_BIT, BLACK_BIT = 0, 8
+OFF_BOARD = 0x88
+
+
 class Piece:
+    """Pieces keep only their per-piece state in slots; the type data (kind, name, short name) lives
+    on the class and is shared by every piece of that type."""
+    __slots__ = ("color", "pos", "moved", "code")
+    kind = EMPTY
+    name = "piece"
+    short_name = "na"
+
     def __init__(self, color: Color, pos: Tuple[int, int]):
         self.color = color
         self.pos = pos
-        self.name = "piece"
-        self.short_name = "na"
         self.moved = False
+        self.code = self.kind | color_bit(color)
 
     def describe(self) -> str:
         return self.color.name + " " + self.name + " " + coord_to_square(self.pos)
@@ -42,49 +61,122 @@ class Piece:
 
 
 class Pawn(Piece):
+    __slots__ = ("just_moved_two_squares",)
+    kind = PAWN
+    name = "pawn"
+    short_name = "P"
+
     def __init__(self, color: Color, pos: Tuple[int, int]):
         super().__init__(color, pos)
-        self.name = "pawn"
-        self.short_name = "P"
-        self.just_moved_two_squares = 0
+        self.just_moved_two_squares = -1
 
 
 class King(Piece):
-    def __init__(self, color: Color, pos: Tuple[int, int]):
-        super().__init__(color, pos)
-        self.name = "king"
-        self.short_name = "K"
+    __slots__ = ()
+    kind = KING
+    name = "king"
+    short_name = "K"
 
 
 class Queen(Piece):
-    def __init__(self, color: Color, pos: Tuple[int, int]):
-        super().__init__(color, pos)
-        self.name = "queen"
-        self.short_name = "Q"
+    __slots__ = ()
+    kind = QUEEN
+    name = "queen"
+    short_name = "Q"
 
 
 class Rook(Piece):
-    def __init__(self, color: Color, pos: Tuple[int, int]):
-        super().__init__(color, pos)
-        self.name = "rook"
-        self.short_name = "R"
+    __slots__ = ()
+    kind = ROOK
+    name = "rook"
+    short_name = "R"
 
 
 class Bishop(Piece):
-    def __init__(self, color: Color, pos: Tuple[int, int]):
-        super().__init__(color, pos)
-        self.name = "bishop"
-        self.short_name = "B"
+    __slots__ = ()
+    kind = BISHOP
+    name = "bishop"
+    short_name = "B"
 
 
 class Knight(Piece):
-    def __init__(self, color: Color, pos: Tuple[int, int]):
-        super().__init__(color, pos)
-        self.name = "knight"
-        self.short_name = "N"
+    __slots__ = ()
+    kind = KNIGHT
+    name = "knight"
+    short_name = "N"
+
+
+class Board:
+    """An 0x88 board: ``squares`` holds a small int code per square for the move generator and
+    ``pieces`` keeps the matching Piece objects so ``board[rank, file]`` keeps working."""
+
+    def __init__(self):
+        self.squares = bytearray(128)
+        self.pieces: List[Optional[Piece]] = [None] * 128
+
+    def __contains__(self, coord: Tuple[int, int]) -> bool:
+        return valid_coord(coord) and self.squares[coord_to_index(coord)] != EMPTY
+
+    def __getitem__(self, coord: Tuple[int, int]) -> Piece:
+        if coord not in self:
+            raise KeyError(coord)
+        return self.pieces[coord_to_index(coord)]
+
+    def __setitem__(self, coord: Tuple[int, int], piece: Piece):
+        if not valid_coord(coord):
+            raise KeyError(coord)
+        index = coord_to_index(coord)
+        self.squares[index], self.pieces[index] = piece.code, piece
+
+    def __delitem__(self, coord: Tuple[int, int]):
+        self.pop(coord)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return sum(1 for index in SQUARES if self.squares[index])
+
+    def get(self, coord: Tuple[int, int], default: Optional[Piece] = None) -> Optional[Piece]:
+        return self[coord] if coord in self else default
+
+    def pop(self, coord: Tuple[int, int]) -> Piece:
+        piece = self[coord]
+        index = coord_to_index(coord)
+        self.squares[index], self.pieces[index] = EMPTY, None
+        return piece
+
+    def keys(self) -> List[Tuple[int, int]]:
+        return [INDEX_COORDS[index] for index in SQUARES if self.squares[index]]
+
+    def values(self) -> List[Piece]:
+        return [self.pieces[index] for index in SQUARES if self.squares[index]]
+
+    def items(self) -> List[Tuple[Tuple[int, int], Piece]]:
+        return [(INDEX_COORDS[index], self.pieces[index]) for index in SQUARES if self.squares[index]]
+
+    def is_attacked(self, index: int, by_bit: int) -> bool:
+        squares = self.squares
+        pawn = PAWN | by_bit
+        for look in PAWN_CAPTURES[by_bit ^ BLACK_BIT][index]:
+            if squares[look] == pawn:
+                return True
+        for attacker, targets in [(KNIGHT | by_bit, KNIGHT_TARGETS), (KING | by_bit, KING_TARGETS)]:
+            for look in targets[index]:
+                if squares[look] == attacker:
+                    return True
+        for sliders, rays in [((BISHOP | by_bit, QUEEN | by_bit), DIAGONAL_RAYS),
+                              ((ROOK | by_bit, QUEEN | by_bit), ORTHOGONAL_RAYS)]:
+            for ray in rays[index]:
+                for look in ray:
+                    if squares[look]:
+                        if squares[look] in sliders:
+                            return True
+                        break
+        return False
 
 
-def create_board() -> Dict[Tuple[int, int], Piece]:
+def create_board() -> Board:
     board = {
         **dict(zip([(0, 4), (7, 4)], [(King, color) for color in [Color.BLACK, Color.WHITE]])),
         **dict(zip([(0, 3), (7, 3)], [(Queen, color) for color in [Color.BLACK, Color.WHITE]])),
@@ -97,13 +189,10 @@ def create_board() -> Dict[Tuple[int, int], Piece]:
         **dict(zip([(1, x) for x in range(8)], [(Pawn, Color.BLACK) for _ in range(8)])),
         **dict(zip([(6, x) for x in range(8)], [(Pawn, Color.WHITE) for _ in range(8)])),
     }
-    for pos in board.keys():
-        board[pos] = board[pos][0](board[pos][1], pos)
-    return board
-
-
-def clear_console():
-    print("\033c")
+    array_board = Board()
+    for pos, (create_func, color) in board.items():
+        array_board[pos] = create_func(color, pos)
+    return array_board
 
 
 def square_to_coord(square: str) -> tuple:
@@ -114,21 +203,33 @@ def coord_to_square(coord: Tuple) -> str:
     return chr(coord[1] + ord("a")) + str(-coord[0] + 8)
 
 
-def add_coords(coord1: Tuple, coord2: Tuple) -> Tuple:
-    return coord1[0] + coord2[0], coord1[1] + coord2[1]
+def format_move(start_coord: Tuple, end_coord: Tuple, promote_func=None) -> str:
+    promotion = "" if promote_func is None else promote_func(Color.WHITE, end_coord).short_name.lower()
+    return coord_to_square(start_coord) + coord_to_square(end_coord) + promotion
 
 
-def mult_coord(coord: Tuple, mult: int) -> Tuple:
-    return coord[0] * mult, coord[1] * mult
+def add_coords(coord1: Tuple, coord2: Tuple) -> Tuple:
+    return coord1[0] + coord2[0], coord1[1] + coord2[1]
 
 
 def parse_fail(move: str) -> Tuple:
     return False, "invalid move: " + move
 
 
+class ParsedMove(NamedTuple):
+    """A move accepted by Chess.parse_move; rejections come back as (False, message) instead."""
+    ok: bool
+    message: str
+    start_coord: Tuple[int, int]
+    end_coord: Tuple[int, int]
+    promote_func: Optional[type]
+    check: bool
+    checkmate: bool
+
+
 def parse_success(msg: str, start_coord: Tuple, dest_coord: Tuple,
-                  promote_func=None, check=False, checkmate=False) -> Tuple:
-    return True, msg, start_coord, dest_coord, promote_func, check, checkmate
+                  promote_func=None, check=False, checkmate=False) -> ParsedMove:
+    return ParsedMove(True, msg, start_coord, dest_coord, promote_func, check, checkmate)
 
 
 def success_message(moving_piece: Piece, dest: str, capture: Piece = None) -> str:
@@ -160,17 +261,50 @@ def opposite_color(color: Color) -> Color:
     return Color.BLACK if color == Color.WHITE else Color.WHITE
 
 
-def filter_chain(iterable: Iterable, *filters: LambdaType) -> Iterable:
-    for filter_func in filters:
-        iterable = filter(filter_func, iterable)
-    return iterable
+def color_dir(color: Color) -> int:
+    return -1 if color == Color.WHITE else 1
+
+
+def color_bit(color: Color) -> int:
+    return BLACK_BIT if color == Color.BLACK else WHITE_BIT
+
+
+def coord_to_index(coord: Tuple) -> int:
+    return coord[0] * 16 + coord[1]
+
+
+class MoveRecord(NamedTuple):
+    """Everything needed to take back a move made with Chess.make_move."""
+    start_coord: Tuple[int, int]
+    end_coord: Tuple[int, int]
+    moving_piece: Piece
+    moved: bool
+    just_moved_two_squares: int
+    captured_piece: Optional[Piece]
+    captured_coord: Optional[Tuple[int, int]]
+    rook_start_coord: Optional[Tuple[int, int]]
+    rook_end_coord: Optional[Tuple[int, int]]
+    rook_moved: bool
+    promoted_piece: Optional[Piece]
+    turn: int
+    zobrist_key: int
+    halfmove_clock: int
+
+
+class GameSummary(NamedTuple):
+    """Outcome of Chess.play_moves; errors are (move number, move, message) for rejected moves."""
+    moves_played: int
+    errors: List[Tuple[int, str, str]]
+    turn: int
+    done: bool
+    winner: Optional[Color]
+    last_message: str
 
 
 piece_map = {
     "K": {
         "create_func": King,
         "scan_args": {
-            "piece_class": "king",
             "deltas": [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)],
             "extended": False,
         },
@@ -178,7 +312,6 @@ piece_map = {
     "Q": {
         "create_func": Queen,
         "scan_args": {
-            "piece_class": "queen",
             "deltas": [(-1, -1), (-1, 1), (1, -1), (1, 1), (-1, 0), (0, -1), (1, 0), (0, 1)],
             "extended": True,
         },
@@ -186,7 +319,6 @@ piece_map = {
     "B": {
         "create_func": Bishop,
         "scan_args": {
-            "piece_class": "bishop",
             "deltas": [(-1, -1), (-1, 1), (1, -1), (1, 1)],
             "extended": True,
         },
@@ -194,7 +326,6 @@ piece_map = {
     "R": {
         "create_func": Rook,
         "scan_args": {
-            "piece_class": "rook",
             "deltas": [(-1, 0), (0, -1), (1, 0), (0, 1)],
             "extended": True,
         },
@@ -202,7 +333,6 @@ piece_map = {
     "N": {
         "create_func": Knight,
         "scan_args": {
-            "piece_class": "knight",
             "deltas": [(-1, -2), (1, -2), (-1, 2), (1, 2), (-2, -1), (-2, 1), (2, -1), (2, 1)],
             "extended": False,
         },
@@ -210,6 +340,87 @@ piece_map = {
 }
 
 
+PIECE_CLASSES = {piece_class.kind: piece_class for piece_class in [Pawn, Knight, Bishop, Rook, Queen, King]}
+PIECE_KINDS = {piece_class.name: kind for kind, piece_class in PIECE_CLASSES.items()}
+KIND_LETTERS = {PAWN: "P", **{entry["create_func"].kind: short_name for short_name, entry in piece_map.items()}}
+SQUARES = [rank * 16 + file for rank in range(8) for file in range(8)]
+INDEX_COORDS = [(index >> 4, index & 7) if not index & OFF_BOARD else None for index in range(128)]
+
+
+def build_rays(deltas: List[Tuple[int, int]], extended: bool) -> List[Tuple[Tuple[int, ...], ...]]:
+    """For every 0x88 index, the squares reached along each delta in order, nearest first."""
+    rays = [()] * 128
+    for index in SQUARES:
+        index_rays = []
+        for delta in deltas:
+            ray, current_look = [], add_coords(INDEX_COORDS[index], delta)
+            while valid_coord(current_look):
+                ray.append(coord_to_index(current_look))
+                if not extended:
+                    break
+                current_look = add_coords(current_look, delta)
+            if ray:
+                index_rays.append(tuple(ray))
+        rays[index] = tuple(index_rays)
+    return rays
+
+
+def build_targets(deltas: List[Tuple[int, int]]) -> List[Tuple[int, ...]]:
+    return [tuple(ray[0] for ray in index_rays) for index_rays in build_rays(deltas, False)]
+
+
+KING_TARGETS = build_targets(piece_map["K"]["scan_args"]["deltas"])
+KNIGHT_TARGETS = build_targets(piece_map["N"]["scan_args"]["deltas"])
+PAWN_CAPTURES = {
+    WHITE_BIT: build_targets([(-1, -1), (-1, 1)]),
+    BLACK_BIT: build_targets([(1, -1), (1, 1)]),
+}
+DIAGONAL_RAYS = build_rays(piece_map["B"]["scan_args"]["deltas"], True)
+ORTHOGONAL_RAYS = build_rays(piece_map["R"]["scan_args"]["deltas"], True)
+PIECE_RAYS = {
+    entry["create_func"].kind: build_rays(entry["scan_args"]["deltas"], entry["scan_args"]["extended"])
+    for entry in piece_map.values()
+}
+
+_zobrist_random = Random(0x9D39247E33776D41)
+ZOBRIST_PIECE_KEYS = [[_zobrist_random.getrandbits(64) for _ in range(128)] for _ in range(16)]
+ZOBRIST_SIDE_KEY = _zobrist_random.getrandbits(64)
+ZOBRIST_EN_PASSANT_KEYS = [_zobrist_random.getrandbits(64) for _ in range(8)]
+_zobrist_castling_keys = [_zobrist_random.getrandbits(64) for _ in range(4)]
+ZOBRIST_CASTLING_KEYS = [
+    reduce(xor, (key for bit, key in enumerate(_zobrist_castling_keys) if rights >> bit & 1), 0)
+    for rights in range(16)
+]
+# moves fit in 16 bits: from square, to square (0-63, rank 8 first), promotion piece (0 for none)
+PROMOTIONS = [None, Queen, Rook, Bishop, Knight]
+INDEX_SQUARES = [(index >> 4) * 8 + (index & 7) for index in range(128)]
+SQUARE_INDICES = [(square >> 3) * 16 + (square & 7) for square in range(64)]
+
+
+def encode_move(start_coord: Tuple[int, int], end_coord: Tuple[int, int], promote_func=None) -> int:
+    return start_coord[0] * 8 + start_coord[1] | (end_coord[0] * 8 + end_coord[1]) << 6 \
+        | PROMOTIONS.index(promote_func) << 12
+
+
+def decode_move(move: int) -> Tuple[Tuple[int, int], Tuple[int, int], Optional[type]]:
+    return INDEX_COORDS[SQUARE_INDICES[move & 63]], INDEX_COORDS[SQUARE_INDICES[move >> 6 & 63]], \
+        PROMOTIONS[move >> 12 & 7]
+
+
+# (king index, rook index) for each castling right bit: white kingside, white queenside, black ...
+CASTLING_SQUARES = [(0x74, 0x77), (0x74, 0x70), (0x04, 0x07), (0x04, 0x00)]
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+# a snapshot is a position block: magic, version, turn, halfmove clock, done and winner bits, moved
+# flags per square, en passant pawn square (255 for none), then the 64 piece codes two to a byte and
+# the captured pieces as a count and codes per side. The current position comes first, then the
+# repetition history as a count and (Zobrist key, count) pairs, the moves played as a count and
+# 16-bit encoded moves and, when there are moves, the block of the position they were played from
+SNAPSHOT = Struct(">4sBIHBQB32s")
+SNAPSHOT_COUNT = Struct(">I")
+SNAPSHOT_KEY = Struct(">QH")
+SNAPSHOT_MAGIC, SNAPSHOT_VERSION = b"PYCS", 4
+
+
 class Chess:
     def __init__(self):
         self.captures = {color: [] for color in [Color.WHITE, Color.BLACK]}
@@ -217,9 +428,206 @@ class Chess:
         self.move_generator = PotentialMoveGenerator(self)
         self.board = create_board()
         self.populate_kings()
+        self.undo_stack: List[MoveRecord] = []
+        self.history = array("H")  # every move played, encoded with encode_move
+        self.root: Optional[bytes] = None  # position block (see SNAPSHOT) the history starts from
         self.winner = None
         self.done = False
         self.turn = 1
+        self.draw_reason: Optional[str] = None
+        self.reset_history()
+        self._move_index: Optional[MoveIndex] = None
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Chess":
+        fields = fen.split()
+        if len(fields) < 4 or len(fields[0].split("/")) != 8 or fields[1] not in ["w", "b"]:
+            raise ValueError("invalid FEN: " + fen)
+        game = cls()
+        game.board = Board()
+        for rank, rank_str in enumerate(fields[0].split("/")):
+            file = 0
+            for char in rank_str:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                create_func = Pawn if char.upper() == "P" else piece_map.get(char.upper(), {}).get("create_func")
+                if create_func is None or not valid_coord((rank, file)):
+                    raise ValueError("invalid FEN: " + fen)
+                color = Color.WHITE if char.isupper() else Color.BLACK
+                piece = game.board[rank, file] = create_func(color, (rank, file))
+                piece.moved = create_func is not Pawn or rank != (6 if color == Color.WHITE else 1)
+                file += 1
+            if file != 8:
+                raise ValueError("invalid FEN: " + fen)
+        for bit, char in enumerate("KQkq"):
+            king_index, rook_index = CASTLING_SQUARES[bit]
+            if char in fields[2] and game.board.squares[king_index] & ~BLACK_BIT == KING \
+                    and game.board.squares[rook_index] & ~BLACK_BIT == ROOK:
+                game.board.pieces[king_index].moved = game.board.pieces[rook_index].moved = False
+        full_moves = int(fields[5]) if len(fields) > 5 and fields[5].isdigit() else 1
+        game.turn = 2 * max(full_moves - 1, 0) + (1 if fields[1] == "w" else 2)
+        if fields[3] != "-":
+            if not valid_square(fields[3]):
+                raise ValueError("invalid FEN: " + fen)
+            rank, file = square_to_coord(fields[3])
+            pawn_coord = (rank - 1 if rank == 5 else rank + 1, file)
+            if game.piece_exists(pawn_coord, piece_class="pawn", piece_color=game.opponent_color()):
+                game.board[pawn_coord].just_moved_two_squares = game.turn - 1
+        game.kings = {color: None for color in [Color.WHITE, Color.BLACK]}
+        game.populate_kings()
+        if None in game.kings.values():
+            raise ValueError("invalid FEN, both kings are required: " + fen)
+        game.reset_history(int(fields[4]) if len(fields) > 4 and fields[4].isdigit() else 0)
+        return game
+
+    def to_fen(self) -> str:
+        ranks = []
+        for rank in range(8):
+            rank_str, empty = "", 0
+            for file in range(8):
+                piece = self.board.get((rank, file))
+                if piece is None:
+                    empty += 1
+                    continue
+                rank_str += (str(empty) if empty else "") + \
+                    (piece.short_name if piece.color == Color.WHITE else piece.short_name.lower())
+                empty = 0
+            ranks.append(rank_str + (str(empty) if empty else ""))
+        rights = self.castling_rights()
+        castling = "".join(char for bit, char in enumerate("KQkq") if rights >> bit & 1) or "-"
+        en_passant_file = self.en_passant_file()
+        en_passant = "-" if en_passant_file is None else "abcdefgh"[en_passant_file] + \
+            ("6" if self.player_color() == Color.WHITE else "3")
+        return "{} {} {} {} {} {}".format("/".join(ranks), "w" if self.player_turn() else "b", castling,
+                                          en_passant, self.halfmove_clock, (self.turn + 1) // 2)
+
+    @staticmethod
+    def stats() -> Dict[str, Dict[str, float]]:
+        """Calls and cumulative seconds per instrumented method, counted while PROFILER is enabled."""
+        return PROFILER.stats()
+
+    def _pack_position(self, state: int = 0) -> bytes:
+        squares, pieces = self.board.squares, self.board.pieces
+        codes = [squares[index] for index in SQUARES]
+        moved = sum(1 << number for number, index in enumerate(SQUARES) if codes[number] and pieces[index].moved)
+        en_passant = next((number for number, index in enumerate(SQUARES) if codes[number] & ~BLACK_BIT == PAWN
+                           and pieces[index].just_moved_two_squares == self.turn - 1), 255)
+        board = bytes(codes[number] << 4 | codes[number + 1] for number in range(0, 64, 2))
+        captures = b"".join(bytes([len(self.captures[color])] + [piece.code for piece in self.captures[color]])
+                            for color in [Color.WHITE, Color.BLACK])
+        return SNAPSHOT.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.turn, self.halfmove_clock, state, moved,
+                             en_passant, board) + captures
+
+    def _load_position(self, data: bytes, offset: int = 0) -> Tuple[int, int]:
+        """Set up the position block of a snapshot at offset; returns its state bits and the offset
+        after it."""
+        if len(data) < offset + SNAPSHOT.size + 2 or data[offset:offset + 4] != SNAPSHOT_MAGIC \
+                or data[offset + 4] != SNAPSHOT_VERSION:
+            raise ValueError("invalid snapshot")
+        _, _, turn, halfmove_clock, state, moved, en_passant, board = SNAPSHOT.unpack_from(data, offset)
+
+        def create_piece(code: int, coord: Optional[Tuple[int, int]]) -> Piece:
+            if code & ~BLACK_BIT not in PIECE_CLASSES:
+                raise ValueError("invalid snapshot")
+            return PIECE_CLASSES[code & ~BLACK_BIT](Color.BLACK if code & BLACK_BIT else Color.WHITE, coord)
+
+        self.board, self.turn = Board(), turn
+        for number, index in enumerate(SQUARES):
+            code = board[number >> 1] >> (0 if number & 1 else 4) & 15
+            if code:
+                piece = self.board[INDEX_COORDS[index]] = create_piece(code, INDEX_COORDS[index])
+                piece.moved = bool(moved >> number & 1)
+                if number == en_passant and code & ~BLACK_BIT == PAWN:
+                    piece.just_moved_two_squares = turn - 1
+        offset += SNAPSHOT.size
+        for color in [Color.WHITE, Color.BLACK]:
+            if offset >= len(data) or offset + 1 + data[offset] > len(data):
+                raise ValueError("invalid snapshot")
+            count = data[offset]
+            self.captures[color] = [create_piece(code, None) for code in data[offset + 1:offset + 1 + count]]
+            offset += 1 + count
+        self.kings = {color: None for color in [Color.WHITE, Color.BLACK]}
+        self.populate_kings()
+        if None in self.kings.values():
+            raise ValueError("invalid snapshot, both kings are required")
+        self.reset_history(halfmove_clock)
+        return state, offset
+
+    def to_snapshot(self, with_history: bool = True) -> bytes:
+        """Compact binary copy of the game: the current position (board, moved flags, en passant
+        pawn, turn, halfmove clock and captures), the result and the repetition history, then the
+        moves played and the position they started from. Without history the moves are left out,
+        which still leaves everything a move check or a search needs."""
+        state = self.done | (0 if self.winner is None else 2 if self.winner == Color.WHITE else 4)
+        keys = b"".join(SNAPSHOT_KEY.pack(key, count) for key, count in self.position_counts.items())
+        history = array("H", self.history if with_history else [])
+        if sys.byteorder == "little":
+            history.byteswap()
+        return self._pack_position(state) + SNAPSHOT_COUNT.pack(len(self.position_counts)) + keys \
+            + SNAPSHOT_COUNT.pack(len(history)) + history.tobytes() + (self.root if history else b"")
+
+    @classmethod
+    def from_snapshot(cls, data: bytes) -> "Chess":
+        """Restore a game saved with to_snapshot. Only the current position is set up; the undo
+        records behind takebacks are rebuilt from the moves when first needed."""
+        game = cls()
+        state, offset = game._load_position(data)
+        if len(data) < offset + SNAPSHOT_COUNT.size:
+            raise ValueError("invalid snapshot")
+        (count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+        offset += SNAPSHOT_COUNT.size
+        end = offset + count * SNAPSHOT_KEY.size
+        if len(data) < end + SNAPSHOT_COUNT.size:
+            raise ValueError("invalid snapshot")
+        game.position_counts = {key: count for key, count in SNAPSHOT_KEY.iter_unpack(data[offset:end])}
+        (count,) = SNAPSHOT_COUNT.unpack_from(data, end)
+        offset = end + SNAPSHOT_COUNT.size
+        game.history = array("H", data[offset:offset + 2 * count])
+        if len(game.history) != count or game.zobrist_key not in game.position_counts:
+            raise ValueError("invalid snapshot")
+        if sys.byteorder == "little":
+            game.history.byteswap()
+        if count:
+            game.root = data[offset + 2 * count:]
+            if cls()._load_position(game.root)[1] != len(game.root):
+                raise ValueError("invalid snapshot")
+        elif offset != len(data):
+            raise ValueError("invalid snapshot")
+        game.done, game.winner = bool(state & 1), Color.WHITE if state & 2 else Color.BLACK if state & 4 else None
+        if game.done and game.winner is None:
+            game.draw_reason = game.find_draw()
+        return game
+
+    def _replay_root(self) -> "Chess":
+        """A game set up in the position the moves of the history were played from."""
+        game = Chess()
+        game._load_position(self.root)
+        return game
+
+    def _replay_move(self, move: int):
+        """Make a move of a restored history without generating the legal moves, only checking
+        enough that a corrupt one can't crash make_move; _rebuild_undo_records checks the result."""
+        try:
+            start_coord, end_coord, promote_func = decode_move(move)
+            piece = self.board.get(start_coord)
+            if piece is None or piece.color != self.player_color() or move >> 15 \
+                    or (promote_func is not None) != (piece.kind == PAWN and end_coord[0] in [0, 7]):
+                raise KeyError(start_coord)
+            self.make_move(start_coord, end_coord, promote_func)
+        except (IndexError, KeyError):  # no such promotion, nothing to move or capture, castling without its rook
+            raise ValueError("invalid snapshot, illegal move in the history") from None
+
+    def _rebuild_undo_records(self):
+        """Recreate the undo records of a restored game by replaying its moves from the root
+        position, checking they lead to the current position."""
+        game = self._replay_root()
+        for move in self.history:
+            game._replay_move(move)
+        if game.zobrist_key != self.zobrist_key or (game.turn, game.halfmove_clock) != (self.turn, self.halfmove_clock):
+            raise ValueError("invalid snapshot, the moves don't lead to the position")
+        self.board, self.captures, self.kings, self.undo_stack = game.board, game.captures, game.kings, game.undo_stack
+        self._move_index = None
 
     def __deepcopy__(self, memo):
         cls = self.__class__
@@ -231,7 +639,7 @@ class Chess:
 
     def populate_kings(self):
         for piece in self.board.values():
-            if piece.name == "king":
+            if piece.kind == KING:
                 self.kings[piece.color] = piece
 
     def player_turn(self) -> int:
@@ -246,21 +654,97 @@ class Chess:
     def opponent_color(self) -> Color:
         return Color.BLACK if self.player_turn() else Color.WHITE
 
+    def castling_rights(self) -> int:
+        """Bitmask of the castling rights still available, derived from the moved flags."""
+        squares, pieces, rights = self.board.squares, self.board.pieces, 0
+        for bit, (king_index, rook_index) in enumerate(CASTLING_SQUARES):
+            color = BLACK_BIT if bit >= 2 else WHITE_BIT
+            if squares[king_index] == KING | color and not pieces[king_index].moved \
+                    and squares[rook_index] == ROOK | color and not pieces[rook_index].moved:
+                rights |= 1 << bit
+        return rights
+
+    def en_passant_file(self) -> Optional[int]:
+        """File of the pawn that may be captured en passant this turn, if any capture is possible."""
+        player_bit = color_bit(self.player_color())
+        rank = 3 if player_bit == WHITE_BIT else 4
+        squares, pieces = self.board.squares, self.board.pieces
+        for index in range(rank * 16, rank * 16 + 8):
+            if squares[index] == PAWN | (player_bit ^ BLACK_BIT) \
+                    and pieces[index].just_moved_two_squares == self.turn - 1:
+                if any(squares[index + file_delta] == PAWN | player_bit for file_delta in [-1, 1]
+                       if not (index + file_delta) & OFF_BOARD):
+                    return index & 7
+                return None
+        return None
+
+    def hash_position(self) -> int:
+        """Compute the Zobrist key of the position from scratch."""
+        key = ZOBRIST_CASTLING_KEYS[self.castling_rights()]
+        for index in SQUARES:
+            if self.board.squares[index]:
+                key ^= ZOBRIST_PIECE_KEYS[self.board.squares[index]][index]
+        if self.player_color() == Color.BLACK:
+            key ^= ZOBRIST_SIDE_KEY
+        en_passant_file = self.en_passant_file()
+        if en_passant_file is not None:
+            key ^= ZOBRIST_EN_PASSANT_KEYS[en_passant_file]
+        return key
+
+    def reset_history(self, halfmove_clock: int = 0):
+        """Recompute the key and piece counts from the board and start a new repetition history."""
+        self.zobrist_key = self.hash_position()
+        self.piece_counts = [0] * 16
+        for index in SQUARES:
+            if self.board.squares[index]:
+                self.piece_counts[self.board.squares[index]] += 1
+        self.halfmove_clock = halfmove_clock
+        self.position_counts: Dict[int, int] = {self.zobrist_key: 1}
+        self.root = None
+
+    def insufficient_material(self) -> bool:
+        """Only kings, or kings and a single knight or bishop, are left on the board."""
+        counts = self.piece_counts
+        if any(counts[kind | bit] for kind in [PAWN, ROOK, QUEEN] for bit in [WHITE_BIT, BLACK_BIT]):
+            return False
+        return sum(counts[kind | bit] for kind in [KNIGHT, BISHOP] for bit in [WHITE_BIT, BLACK_BIT]) <= 1
+
+    def find_draw(self) -> Optional[str]:
+        """Why the position is drawn, if it is. Everything but stalemate is a constant time lookup
+        of state kept up to date by make_move and unmake_move."""
+        if self.position_counts.get(self.zobrist_key, 0) >= 3:
+            return "threefold repetition"
+        if self.halfmove_clock >= 100:
+            return "fifty-move rule"
+        if self.insufficient_material():
+            return "insufficient material"
+        color = self.player_color()
+        if not self.is_check(color) and next(self.move_generator.get_moves(color), None) is None:
+            return "stalemate"
+        return None
+
     def piece_exists(self, coord: tuple, piece_class=None,
                      piece_color=None, specific_rank=None, specific_file=None) -> bool:
-        return coord in self.board \
+        if not valid_coord(coord):
+            return False
+        code = self.board.squares[coord[0] * 16 + coord[1]]
+        return code != EMPTY \
             and (specific_rank is None or coord[0] == specific_rank) \
             and (specific_file is None or coord[1] == specific_file) \
-            and (piece_class is None or self.board[coord].name == piece_class) \
-            and (piece_color is None or self.board[coord].color == piece_color)
+            and (piece_class is None or code & ~BLACK_BIT == PIECE_KINDS[piece_class]) \
+            and (piece_color is None or code & BLACK_BIT == color_bit(piece_color))
+
+    def move_index(self) -> "MoveIndex":
+        """The legal move index of the current position, rebuilt only once the position changes."""
+        if self._move_index is None or self._move_index.zobrist_key != self.zobrist_key:
+            self._move_index = MoveIndex(self)
+        return self._move_index
+
+    def is_square_attacked(self, coord: Tuple[int, int], by_color: Color) -> bool:
+        return self.board.is_attacked(coord_to_index(coord), color_bit(by_color))
 
     def is_check(self, king_color: Color) -> bool:
-        move_generator = self.move_generator.get_moves(opposite_color(king_color), skip_check=True)
-        for move in move_generator:
-            if move[1] != self.kings[king_color].pos:
-                continue
-            return True
-        return False
+        return self.is_square_attacked(self.kings[king_color].pos, opposite_color(king_color))
 
     def is_checkmate(self, king_color: Color) -> bool:
         if not self.is_check(king_color):
@@ -271,49 +755,257 @@ class Chess:
             return True
         return False
 
-    def start(self, sleep_time: float = 0):
-        msg = ""
+    def start(self, sleep_time: float = 0, engine=None, engine_color: Color = Color.BLACK, book=None,
+              tablebase=None, ponder: bool = False):
+        """Run the interactive game loop. With an engine (see pychess.engine.Engine) it plays the
+        engine_color side itself. Typing "hint" lists the moves of the opening book (see
+        pychess.book.OpeningBook), the endgame tablebase verdict (see pychess.tablebase.Tablebase)
+        or else the engine's choice; "undo" (or "takeback") takes back a move and "moves" lists the
+        moves played. With ponder the position is analysed while waiting for input (see Ponderer)."""
+        msg, renderer = "", TerminalRenderer()
+        ponderer = Ponderer(engine) if ponder else None
         while not self.done:
-            print_game(self, msg)
-            move = input(" {} move: ".format("White" if self.player_turn() else "Black"))
-            result = self.parse_move(move)
-            msg = result[1]
-            if result[0]:
-                if result[6]:
-                    msg = "(checkmate) " + msg
-                    self.done, self.winner = True, self.player_color()
-                elif result[5]:
-                    msg = "(check) " + msg
-                self.move(*result[2:5])
+            renderer.draw(self, msg)
+            if engine is not None and self.player_color() == engine_color:
+                result = engine.search(self)
+                if result.move is None:
+                    self.done, msg = True, "(stalemate) no legal moves"
+                    break
+                msg = self.play_move(self.san(*result.move))[1]
+                if result.source == "search":
+                    msg += " (depth {}, {:.0f} nodes/s{})".format(
+                        result.depth, result.nodes_per_second,
+                        "" if engine.table is None else ", {:.0%} hash hits".format(engine.table.hit_rate))
+                else:
+                    msg += " ({})".format(result.source)
+                continue
+            if ponderer is not None:
+                ponderer.start(self)
+            try:
+                move = input(" {} move: ".format("White" if self.player_turn() else "Black"))
+            finally:
+                if ponderer is not None:
+                    ponderer.stop(self)
+            if move.strip() == "hint":
+                msg = self.hint(engine, book, tablebase, ponderer.analysis(self) if ponderer is not None else None)
+                continue
+            if move.strip() in ["undo", "takeback"]:
+                # against the engine take back its reply too, so it's the player's turn again
+                taken = self.takeback(2 if engine is not None and len(self.history) > 1 else 1)
+                msg = "took back {} move{}".format(taken, "s" if taken > 1 else "") if taken else "nothing to take back"
+                continue
+            if move.strip() == "moves":
+                msg = self.move_list() or "no moves played yet"
+                continue
+            msg = self.play_move(move)[1]
             sleep(sleep_time)
-        print_game(self, msg)
+        renderer.draw(self, msg)
+
+    def hint(self, engine=None, book=None, tablebase=None, pondered=None) -> str:
+        """pondered is an engine search result already worked out for this position, if any."""
+        moves = book.moves(self) if book is not None else []
+        if moves:
+            return "book moves: " + ", ".join(self.san(*move) for move in moves)
+        known = tablebase.probe(self) if tablebase is not None else None
+        move = tablebase.best_move(self) if known is not None else None
+        if move is not None:
+            verdict = "draw" if not known.wdl else "{} in {}".format(
+                "mate" if known.wdl > 0 else "mated", (known.distance + 1) // 2)
+            return "tablebase: {}, play {}".format(verdict, self.san(*move))
+        if pondered is not None and pondered.move is not None:
+            return "engine suggests {} (depth {})".format(self.san(*pondered.move), pondered.depth)
+        if engine is not None:
+            result = engine.search(self)
+            if result.move is not None:
+                return "engine suggests " + self.san(*result.move)
+        return "no hint available"
+
+    def san(self, start_coord: Tuple[int, int], end_coord: Tuple[int, int], promote_func=None) -> str:
+        """Standard algebraic notation of a legal move in the current position."""
+        move_index = self.move_index()
+        piece = self.board[start_coord]
+        is_check, is_checkmate = move_index.check_flags(self, start_coord, end_coord, promote_func)
+        suffix = "#" if is_checkmate else "+" if is_check else ""
+        if piece.kind == KING and abs(end_coord[1] - start_coord[1]) == 2:
+            return ("O-O-O" if end_coord[1] < start_coord[1] else "O-O") + suffix
+        is_capture = end_coord in self.board or (piece.kind == PAWN and start_coord[1] != end_coord[1])
+        dest = coord_to_square(end_coord)
+        if piece.kind == PAWN:
+            move = (coord_to_square(start_coord)[0] + "x" if is_capture else "") + dest
+            if promote_func is not None:
+                move += "=" + promote_func(piece.color, end_coord).short_name
+            return move + suffix
+        others = [coord for coord in move_index.origins.get((piece.short_name, end_coord), []) if coord != start_coord]
+        square = coord_to_square(start_coord)
+        if not others:
+            disambiguation = ""
+        elif all(coord[1] != start_coord[1] for coord in others):
+            disambiguation = square[0]
+        elif all(coord[0] != start_coord[0] for coord in others):
+            disambiguation = square[1]
+        else:
+            disambiguation = square
+        return piece.short_name + disambiguation + ("x" if is_capture else "") + dest + suffix
+
+    def play_move(self, move: str) -> Tuple[bool, str]:
+        """Parse and play a single move, returning whether it was played and the message to show."""
+        parsed = self.parse_move(move)
+        if not parsed[0]:
+            return False, parsed[1]
+        return True, self.play_parsed(parsed)
+
+    def play_parsed(self, parsed: ParsedMove) -> str:
+        """Play a move accepted by parse_move and settle the game if it ends in checkmate or a draw,
+        returning the message to show."""
+        msg = parsed.message
+        if parsed.checkmate:
+            msg = "(checkmate) " + msg
+            self.done, self.winner = True, self.player_color()
+        elif parsed.check:
+            msg = "(check) " + msg
+        self.move(parsed.start_coord, parsed.end_coord, parsed.promote_func)
+        if not self.done:
+            self.draw_reason = self.find_draw()
+            if self.draw_reason is not None:
+                msg = "(draw by {}) ".format(self.draw_reason) + msg
+                self.done = True
+        return msg
+
+    def takeback(self, count: int = 1) -> int:
+        """Take back up to count moves, reopening a finished game; returns how many were taken back."""
+        count = min(count, len(self.history))
+        if len(self.undo_stack) < count:
+            self._rebuild_undo_records()
+        for _ in range(count):
+            self.unmake_move()
+        if count:
+            self.done, self.winner, self.draw_reason = False, None, None
+        return count
+
+    def move_list(self) -> str:
+        """The moves played so far in SAN with move numbers, worked out by replaying the history on
+        a copy of the position it started from."""
+        if not self.history:
+            return ""
+        if len(self.undo_stack) < len(self.history):
+            self._rebuild_undo_records()
+        game, parts = self._replay_root(), []
+        for move in self.history:
+            if game.player_turn() or not parts:
+                parts.append("{}.{}".format((game.turn + 1) // 2, "" if game.player_turn() else ".."))
+            parts.append(game.san(*decode_move(move)))
+            game._replay_move(move)
+        return " ".join(parts)
+
+    def play_moves(self, moves: Iterable[str], stop_on_error: bool = False) -> GameSummary:
+        """Play moves without rendering anything, stopping once the game is done. Blank lines are
+        skipped and rejected moves are collected with their 1-based position in moves."""
+        played, errors, msg = 0, [], ""
+        for number, move in enumerate(moves, 1):
+            if self.done:
+                break
+            move = move.strip()
+            if not move:
+                continue
+            success, msg = self.play_move(move)
+            if success:
+                played += 1
+            else:
+                errors.append((number, move, msg))
+                if stop_on_error:
+                    break
+        return GameSummary(played, errors, self.turn, self.done, self.winner, msg)
 
     def move(self, start_coord: Tuple, end_coord: Tuple, promote_func=None):
+        self.make_move(start_coord, end_coord, promote_func)
+
+    def make_move(self, start_coord: Tuple, end_coord: Tuple, promote_func=None) -> MoveRecord:
+        if self.root is None:
+            self.root = self._pack_position()
+        key = self.zobrist_key ^ ZOBRIST_CASTLING_KEYS[self.castling_rights()] ^ ZOBRIST_SIDE_KEY
+        en_passant_file = self.en_passant_file()
+        if en_passant_file is not None:
+            key ^= ZOBRIST_EN_PASSANT_KEYS[en_passant_file]
+
+        moving_piece = self.board.pop(start_coord)
+        key ^= ZOBRIST_PIECE_KEYS[moving_piece.code][coord_to_index(start_coord)]
+        captured_piece, captured_coord = None, None
         if end_coord in self.board:
-            self.captures[self.player_color()].append(self.board[end_coord])
-        elif self.board[start_coord].name == "pawn" and start_coord[1] != end_coord[1]:
-            delta = (self.player_turn() - 0.5) * 2
-            capture_coord = add_coords(end_coord, (delta, 0))
-            self.captures[self.player_color()].append(self.board.pop(capture_coord))
-        self.board[end_coord] = self.board[start_coord]
-        self.board[end_coord].pos = end_coord
-        self.board[end_coord].moved = True
-        self.board.pop(start_coord)
-
-        if promote_func is not None:
-            self.board[end_coord] = promote_func(self.player_color(), end_coord)
-        if self.board[end_coord].name == "pawn" and abs(end_coord[0] - start_coord[0]) == 2:
-            self.board[end_coord].just_moved_two_squares = self.turn
-        if self.board[end_coord].name == "king" and abs(end_coord[1] - start_coord[1]) == 2:
+            captured_coord = end_coord
+        elif moving_piece.kind == PAWN and start_coord[1] != end_coord[1]:
+            captured_coord = start_coord[0], end_coord[1]
+        if captured_coord is not None:
+            captured_piece = self.board.pop(captured_coord)
+            key ^= ZOBRIST_PIECE_KEYS[captured_piece.code][coord_to_index(captured_coord)]
+            self.captures[self.player_color()].append(captured_piece)
+            self.piece_counts[captured_piece.code] -= 1
+
+        rook_start_coord, rook_end_coord, rook_moved = None, None, False
+        if moving_piece.kind == KING and abs(end_coord[1] - start_coord[1]) == 2:
             if end_coord[1] - start_coord[1] < 0:
-                rook_pos = add_coords(end_coord, (0, -2))
-                self.board[add_coords(end_coord, (0, 1))] = self.board[rook_pos]
-                self.board.pop(rook_pos)
+                rook_start_coord, rook_end_coord = add_coords(end_coord, (0, -2)), add_coords(end_coord, (0, 1))
             else:
-                rook_pos = add_coords(end_coord, (0, 1))
-                self.board[add_coords(end_coord, (0, -1))] = self.board[rook_pos]
-                self.board.pop(rook_pos)
+                rook_start_coord, rook_end_coord = add_coords(end_coord, (0, 1)), add_coords(end_coord, (0, -1))
+            rook = self.board.pop(rook_start_coord)
+            rook_moved = rook.moved
+            rook.pos, rook.moved = rook_end_coord, True
+            self.board[rook_end_coord] = rook
+            key ^= ZOBRIST_PIECE_KEYS[rook.code][coord_to_index(rook_start_coord)] \
+                ^ ZOBRIST_PIECE_KEYS[rook.code][coord_to_index(rook_end_coord)]
+
+        record = MoveRecord(
+            start_coord, end_coord, moving_piece, moving_piece.moved,
+            moving_piece.just_moved_two_squares if moving_piece.kind == PAWN else -1, captured_piece, captured_coord,
+            rook_start_coord, rook_end_coord, rook_moved, None, self.turn, self.zobrist_key, self.halfmove_clock)
+        moving_piece.pos, moving_piece.moved = end_coord, True
+        self.board[end_coord] = moving_piece
+        if promote_func is not None:
+            self.board[end_coord] = promote_func(self.player_color(), end_coord)
+            record = record._replace(promoted_piece=self.board[end_coord])
+            self.piece_counts[moving_piece.code] -= 1
+            self.piece_counts[self.board[end_coord].code] += 1
+        key ^= ZOBRIST_PIECE_KEYS[self.board[end_coord].code][coord_to_index(end_coord)]
+        if moving_piece.kind == PAWN and abs(end_coord[0] - start_coord[0]) == 2:
+            moving_piece.just_moved_two_squares = self.turn
+        self.undo_stack.append(record)
+        self.history.append(encode_move(start_coord, end_coord, promote_func))
         self.turn += 1
+        self.halfmove_clock = 0 if moving_piece.kind == PAWN or captured_piece is not None else self.halfmove_clock + 1
+
+        key ^= ZOBRIST_CASTLING_KEYS[self.castling_rights()]
+        en_passant_file = self.en_passant_file()
+        if en_passant_file is not None:
+            key ^= ZOBRIST_EN_PASSANT_KEYS[en_passant_file]
+        self.zobrist_key = key
+        self.position_counts[key] = self.position_counts.get(key, 0) + 1
+        return record
+
+    def unmake_move(self) -> MoveRecord:
+        record = self.undo_stack.pop()
+        self.history.pop()
+        if self.position_counts[self.zobrist_key] > 1:
+            self.position_counts[self.zobrist_key] -= 1
+        else:
+            del self.position_counts[self.zobrist_key]
+        self.turn, self.zobrist_key, self.halfmove_clock = record.turn, record.zobrist_key, record.halfmove_clock
+        moving_piece = record.moving_piece
+        self.board.pop(record.end_coord)
+        moving_piece.pos, moving_piece.moved = record.start_coord, record.moved
+        if moving_piece.kind == PAWN:
+            moving_piece.just_moved_two_squares = record.just_moved_two_squares
+        self.board[record.start_coord] = moving_piece
+        if record.rook_start_coord is not None:
+            rook = self.board.pop(record.rook_end_coord)
+            rook.pos, rook.moved = record.rook_start_coord, record.rook_moved
+            self.board[record.rook_start_coord] = rook
+        if record.promoted_piece is not None:
+            self.piece_counts[record.promoted_piece.code] -= 1
+            self.piece_counts[moving_piece.code] += 1
+        if record.captured_piece is not None:
+            self.captures[self.player_color()].pop()
+            self.board[record.captured_coord] = record.captured_piece
+            self.piece_counts[record.captured_piece.code] += 1
+        return record
 
     def parse_move(self, move: str) -> Tuple:
         if len(move) < 2:
@@ -321,24 +1013,21 @@ class Chess:
         original_move = move
         move = move.strip()
 
-        move_generator = self.move_generator.get_moves(self.player_color())
-        color_filter = lambda move: self.board[move[0]].color == self.player_color()
-        piece_filter = lambda move: self.board[move[0]].name == "king"
-        dest_filter = lambda move: move[0][0] == move[1][0] and abs(move[0][1] - move[1][1]) == 2
-        if move == "O-O-O":
-            dir_filter = lambda move: move[0][1] > move[1][1]
-            potential_moves = list(filter_chain(
-                move_generator, dest_filter, piece_filter, color_filter, dir_filter))
-            if len(potential_moves) == 1:
-                return parse_success("queenside castle", *potential_moves[0])
-            return False, "invalid queenside castle"
-        if move == "O-O":
-            dir_filter = lambda move: move[0][1] < move[1][1]
-            potential_moves = list(filter_chain(
-                move_generator, dest_filter, piece_filter, color_filter, dir_filter))
-            if len(potential_moves) == 1:
-                return parse_success("kingside castle", *potential_moves[0])
-            return False, "invalid kingside castle"
+        move_index = self.move_index()
+        castle = move.rstrip("+#")
+        if castle in ["O-O-O", "O-O"]:
+            side = "queenside" if castle == "O-O-O" else "kingside"
+            start_coord = self.kings[self.player_color()].pos
+            dest_coord = add_coords(start_coord, (0, -2 if castle == "O-O-O" else 2))
+            if start_coord not in move_index.origins.get(("K", dest_coord), []):
+                return False, "invalid {} castle".format(side)
+            is_check, is_checkmate = move_index.check_flags(self, start_coord, dest_coord)
+            if move.endswith("+") and not is_check:
+                return False, "not check"
+            if move.endswith("#") and not is_checkmate:
+                return False, "not checkmate"
+            return parse_success(side + " castle", start_coord, dest_coord,
+                                 check=is_check and not is_checkmate, checkmate=is_checkmate)
 
         success_args = {"promote_func": None, "check": False, "checkmate": False}
         if move[-1:] == "+":
@@ -377,8 +1066,7 @@ class Chess:
         if self.piece_exists(dest_coord, piece_color=self.opponent_color()):
             capture = self.board[dest_coord]
         if moving_piece is None and not self.piece_exists(dest_coord):
-            delta = (self.player_turn() - 0.5) * 2
-            capture_look = add_coords(dest_coord, (delta, 0))
+            capture_look = add_coords(dest_coord, (-color_dir(self.player_color()), 0))
             if self.piece_exists(
                     capture_look, piece_class="pawn", piece_color=self.opponent_color()) \
                     and self.board[capture_look].just_moved_two_squares == self.turn - 1:
@@ -405,158 +1093,406 @@ class Chess:
         elif len(move) == 2:
             return parse_fail(original_move)
 
-        rank_filter = lambda move: specific_rank is None or specific_rank == move[0][0]
-        file_filter = lambda move: specific_file is None or specific_file == move[0][1]
-        color_filter = lambda move: self.board[move[0]].color == self.player_color()
-        piece_filter = lambda move: self.board[move[0]].name == "pawn"
-        dest_filter = lambda move: move[1] == dest_coord
-        if moving_piece is not None:
-            piece_class: str = piece_map[moving_piece]["scan_args"]["piece_class"]
-            piece_filter = lambda move: self.board[move[0]].name == piece_class
-        potential_moves = list(filter_chain(
-            move_generator, dest_filter, piece_filter, color_filter, rank_filter, file_filter))
+        potential_moves = [start_coord for start_coord in move_index.origins.get((moving_piece or "P", dest_coord), [])
+                           if (specific_rank is None or specific_rank == start_coord[0])
+                           and (specific_file is None or specific_file == start_coord[1])]
         if len(potential_moves) > 1:
             return False, "ambiguous move, must specify distinguishing rank and/or file"
         if len(potential_moves) == 1:
-            square = potential_moves[0][0]
+            square = potential_moves[0]
             success = parse_success(success_message(self.board[square], dest, capture),
                                     square, dest_coord, **success_args)
-            copy = deepcopy(self)
-            copy.move(*success[2:5])
-            is_checkmate = copy.is_checkmate(self.opponent_color())
-            is_check = copy.is_check(self.opponent_color())
-            if not success[6] and is_checkmate:
+            is_check, is_checkmate = move_index.check_flags(self, square, dest_coord, success.promote_func)
+            if not success.checkmate and is_checkmate:
                 return False, "use checkmate notation"
-            if not success[5] and is_check and not is_checkmate:
+            if not success.check and is_check and not is_checkmate:
                 return False, "use check notation"
-            if success[5] and not is_check:
+            if success.check and not is_check:
                 return False, "not check"
-            if success[6] and not is_checkmate:
+            if success.checkmate and not is_checkmate:
                 return False, "not checkmate"
             return success
         return parse_fail(original_move)
 
 
-def print_game(game: Chess, msg: str):
-    clear_console()
-    print_board(game)
-    print(" " + msg)
-
+class MoveIndex:
+    """The legal moves of one position keyed by (piece letter, destination) for SAN parsing, with
+    check/checkmate flags worked out once per move the first time they are asked for."""
 
-def print_captures(game: Chess, color: Color, rank: int):
-    columns = 2
-    rank_str = " "
-    for col in range(columns):
-        tile_color = (rank + col) % 2 * (44 - 42) + 42
-        if len(game.captures[color]) > rank + (8 * col):
-            rank_str += str(game.captures[color][rank + (8 * col)]).format(tile_color)
-        else:
-            rank_str += str(Color.BLACK).format(tile_color) + " "
-        rank_str += " " + str(Color.ENDC)
-    print(rank_str, end="")
-
-
-def print_board(game: Chess):
-    print(" caps\t  a b c d e f g h \t caps")
-    for rank in range(8):
-        print_captures(game, Color.WHITE, rank)
-        rank_str = "\t  "
-        for file in range(8):
-            tile_color = (rank + file) % 2 * (44 - 42) + 42
-            if (rank, file) in game.board:
-                rank_str += str(game.board[rank, file]).format(tile_color)
-            else:
-                rank_str += str(Color.BLACK).format(tile_color) + " "
-            rank_str += " " + str(Color.ENDC)
-        rank_str += " {}\t".format(str(8 - rank))
-        print(rank_str, end="")
-        print_captures(game, Color.BLACK, rank)
-        print()
-    print()
+    def __init__(self, game: Chess):
+        self.zobrist_key = game.zobrist_key
+        self.origins: Dict[Tuple[str, Tuple[int, int]], List[Tuple[int, int]]] = {}
+        self.flags: Dict[Tuple, Tuple[bool, bool]] = {}
+        squares = game.board.squares
+        for start_coord, end_coord in game.move_generator.get_moves(game.player_color()):
+            letter = KIND_LETTERS[squares[coord_to_index(start_coord)] & ~BLACK_BIT]
+            self.origins.setdefault((letter, end_coord), []).append(start_coord)
+
+    def check_flags(self, game: Chess, start_coord: Tuple[int, int], end_coord: Tuple[int, int],
+                    promote_func=None) -> Tuple[bool, bool]:
+        """Whether the move gives check and whether it gives checkmate."""
+        key = start_coord, end_coord, promote_func
+        if key not in self.flags:
+            opponent_color = game.opponent_color()
+            game.make_move(start_coord, end_coord, promote_func)
+            self.flags[key] = game.is_check(opponent_color), game.is_checkmate(opponent_color)
+            game.unmake_move()
+        return self.flags[key]
+
+
+class Ponderer:
+    """Analyses the position in a background thread while the player thinks over their move: the
+    legal move index, the check and checkmate flags of every reply and, with an engine, a search
+    that runs until it is stopped. The thread works on a copy of the game, and stop() installs the
+    finished move index in the game so parsing the player's move finds it all worked out."""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.cancel = Event()
+        self.thread: Optional[Thread] = None
+        self.zobrist_key: Optional[int] = None
+        self.move_index: Optional[MoveIndex] = None
+        self.result = None
+        self.replies = 0
+
+    def start(self, game: Chess):
+        self.stop()
+        if self.zobrist_key != game.zobrist_key:
+            self.zobrist_key, self.move_index, self.result, self.replies = game.zobrist_key, None, None, 0
+        self.cancel.clear()
+        self.thread = Thread(target=self._ponder, args=(deepcopy(game),), daemon=True)
+        self.thread.start()
+
+    def _ponder(self, game: Chess):
+        if self.move_index is None:
+            self.move_index = MoveIndex(game)
+        for move in list(game.move_generator.get_moves_with_promotions(game.player_color())):
+            if self.cancel.is_set():
+                return
+            self.move_index.check_flags(game, *move)
+        self.replies = len(self.move_index.flags)
+        if self.engine is not None and not self.cancel.is_set():
+            result = self.engine.search(game, float("inf"))
+            if self.result is None or result.depth >= self.result.depth:
+                self.result = result
+
+    def stop(self, game: Optional[Chess] = None):
+        """Cancel the analysis and wait for the thread, then hand the move index to game if it is
+        still in the analysed position."""
+        if self.thread is not None:
+            self.cancel.set()
+            if self.engine is not None:
+                self.engine.stop()
+            self.thread.join()
+            if self.engine is not None:
+                self.engine.resume()
+            self.thread = None
+        if game is not None and self.move_index is not None and game.zobrist_key == self.zobrist_key:
+            game._move_index = self.move_index
+
+    def analysis(self, game: Chess):
+        """The engine's search result for the position of game, if it was analysed."""
+        return self.result if game.zobrist_key == self.zobrist_key else None
+
+
+# screen positions (row, column, 1-based) of the board and the two columns of captured pieces per side
+BOARD_ROW, BOARD_COLUMN, RANK_LABEL_COLUMN = 2, 11, 28
+CAPTURE_COLUMNS = {Color.WHITE: 2, Color.BLACK: 34}
+MESSAGE_ROW = 11
+
+
+def tile_cell(piece: Optional[Piece], tile_color: int) -> str:
+    if piece is None:
+        return str(Color.BLACK).format(tile_color) + "  " + str(Color.ENDC)
+    return str(piece).format(tile_color) + " " + str(Color.ENDC)
+
+
+class TerminalRenderer:
+    """Draws games in the terminal. The first frame clears the screen; after that only the squares
+    and capture cells that changed since the last frame are redrawn, each placed with a cursor
+    positioning escape, and every frame goes out in a single write."""
+
+    def __init__(self, out: Optional[TextIO] = None):
+        self.out = out
+        self.cells: Dict[Tuple[int, int], str] = {}
+
+    def frame(self, game: Chess) -> Dict[Tuple[int, int], str]:
+        cells = {}
+        for rank in range(8):
+            for file in range(8):
+                tile_color = (rank + file) % 2 * (44 - 42) + 42
+                cells[BOARD_ROW + rank, BOARD_COLUMN + 2 * file] = tile_cell(game.board.get((rank, file)), tile_color)
+            for color, column in CAPTURE_COLUMNS.items():
+                for col in range(2):
+                    captures = game.captures[color]
+                    piece = captures[rank + 8 * col] if len(captures) > rank + 8 * col else None
+                    cells[BOARD_ROW + rank, column + 2 * col] = tile_cell(piece, (rank + col) % 2 * (44 - 42) + 42)
+        return cells
+
+    def render(self, game: Chess, msg: str) -> str:
+        cells, parts = self.frame(game), []
+        if not self.cells:
+            parts.append("\033[2J\033[H caps\033[1;{}Ha b c d e f g h\033[1;{}Hcaps".format(
+                BOARD_COLUMN, CAPTURE_COLUMNS[Color.BLACK]))
+            parts.extend("\033[{};{}H{}".format(BOARD_ROW + rank, RANK_LABEL_COLUMN, 8 - rank) for rank in range(8))
+        for (row, column), cell in cells.items():
+            if self.cells.get((row, column)) != cell:
+                parts.append("\033[{};{}H{}".format(row, column, cell))
+        self.cells = cells
+        parts.append("\033[{};1H\033[J {}\n".format(MESSAGE_ROW, msg))
+        return "".join(parts)
+
+    def draw(self, game: Chess, msg: str):
+        out = sys.stdout if self.out is None else self.out
+        out.write(self.render(game, msg))
+        out.flush()
 
 
 class PotentialMoveGenerator:
     def __init__(self, game: Chess):
         self.game = game
 
-    def _scan_deltas(self, coord: Tuple[int, int], scan_args: Dict[str, Any],
-                     piece_exists_args: Dict[str, Any] = {}, find_empty: bool = True) -> Generator:
-        for delta in scan_args["deltas"]:
-            mult = 1
-            while True:
-                current_look = add_coords(coord, mult_coord(delta, mult))
-                if valid_coord(current_look) and \
-                        (find_empty and not self.game.piece_exists(current_look)
-                         or self.game.piece_exists(current_look, **piece_exists_args)):
-                    yield coord, current_look
-                if not scan_args["extended"] \
-                        or not valid_coord(current_look) or self.game.piece_exists(current_look):
+    def _scan_rays(self, index: int, rays: Tuple[Tuple[int, ...], ...],
+                   opponent_bit: int, find_empty: bool = True) -> Generator:
+        squares = self.game.board.squares
+        for ray in rays:
+            for look in ray:
+                if squares[look]:
+                    if squares[look] & BLACK_BIT == opponent_bit:
+                        yield look
                     break
-                mult += 1
-
-    def _get_castling_moves(self, coord: Tuple[int, int], player_color: Color) -> Generator:
-        if not self.game.board[coord].moved:
-            kingside, queenside = True, True
-            rook_pos = add_coords(coord, (0, -4))
-            if self.game.piece_exists(rook_pos, piece_class="rook", piece_color=player_color) \
-                    and not self.game.board[rook_pos].moved:
-                for file_delta in range(-1, -4, -1):
-                    if self.game.piece_exists(add_coords(coord, (0, file_delta))):
-                        queenside = False
-                        break
-                if queenside and not self._is_self_check(player_color, coord, add_coords(coord, (0, -1))):
-                    yield coord, add_coords(coord, (0, -2))
-            rook_pos = add_coords(coord, (0, 3))
-            if self.game.piece_exists(rook_pos, piece_class="rook", piece_color=player_color) \
-                    and not self.game.board[rook_pos].moved:
-                for file_delta in range(1, 3):
-                    if self.game.piece_exists(add_coords(coord, (0, file_delta))):
-                        kingside = False
-                        break
-                if kingside and not self._is_self_check(player_color, coord, add_coords(coord, (0, 1))):
-                    yield coord, add_coords(coord, (0, 2))
-
-    def _get_moves_pawn(self, coord: Tuple[int, int], opponent_color: Color) -> Generator:
-        delta = self.game.get_player_dir()
-        first_look = add_coords(coord, (delta, 0))
-        second_look = add_coords(coord, (delta * 2, 0))
-        if not self.game.piece_exists(first_look):
-            yield coord, first_look
-            if not self.game.board[coord].moved and not self.game.piece_exists(second_look):
-                yield coord, second_look
-        capture_looks = [add_coords(coord, (delta, file_delta)) for file_delta in [-1, 1]]
-        for capture_look in capture_looks:
-            if self.game.piece_exists(capture_look):
-                yield coord, capture_look
-            elif not self.game.piece_exists(capture_look):
-                en_passant_look = add_coords(capture_look, (-delta, 0))
-                if self.game.piece_exists(en_passant_look, piece_class="pawn", piece_color=opponent_color) \
-                        and self.game.board[en_passant_look].just_moved_two_squares == self.game.turn - 1:
-                    yield coord, capture_look
-
-    def _get_moves(self, coord: Tuple[int, int], player_color: Color, find_empty: bool = True) -> Generator:
-        opponent_color = opposite_color(player_color)
-        if self.game.board[coord].short_name in piece_map:
-            scan_args = piece_map[self.game.board[coord].short_name]["scan_args"]
-            move_generator = self._scan_deltas(coord, scan_args, {"piece_color": opponent_color}, find_empty)
-            if self.game.board[coord].name == "king":
-                move_generator = chain(move_generator, self._get_castling_moves(coord, player_color))
-        else:
-            move_generator = self._get_moves_pawn(coord, opponent_color)
-        for move in move_generator:
-            yield move
+                if find_empty:
+                    yield look
+
+    def _get_castling_moves(self, index: int, player_color: Color) -> Generator:
+        board, opponent_bit = self.game.board, color_bit(opposite_color(player_color))
+        if not board.pieces[index].moved and not board.is_attacked(index, opponent_bit):
+            for rook_delta, file_dir in [(-4, -1), (3, 1)]:
+                rook_index = index + rook_delta
+                if rook_index & OFF_BOARD or board.squares[rook_index] != ROOK | color_bit(player_color) \
+                        or board.pieces[rook_index].moved:
+                    continue
+                if any(board.squares[index + file_delta] for file_delta in range(file_dir, rook_delta, file_dir)):
+                    continue
+                if any(board.is_attacked(index + file_delta, opponent_bit) for file_delta in [file_dir, file_dir * 2]):
+                    continue
+                yield index + file_dir * 2
+
+    def _get_moves_pawn(self, index: int, player_color: Color) -> Generator:
+        board, opponent_bit = self.game.board, color_bit(opposite_color(player_color))
+        squares = board.squares
+        forward = color_dir(player_color) * 16
+        first_look = index + forward
+        if first_look & OFF_BOARD:
+            return
+        if not squares[first_look]:
+            yield first_look
+            second_look = first_look + forward
+            if not board.pieces[index].moved and not second_look & OFF_BOARD and not squares[second_look]:
+                yield second_look
+        for capture_look in PAWN_CAPTURES[color_bit(player_color)][index]:
+            if squares[capture_look]:
+                if squares[capture_look] & BLACK_BIT == opponent_bit:
+                    yield capture_look
+                continue
+            en_passant_look = capture_look - forward
+            if squares[en_passant_look] == PAWN | opponent_bit \
+                    and board.pieces[en_passant_look].just_moved_two_squares == self.game.turn - 1:
+                yield capture_look
+
+    def _get_moves(self, index: int, player_color: Color, find_empty: bool = True) -> Generator:
+        """Pseudo-legal destination indices of the piece on index."""
+        kind = self.game.board.squares[index] & ~BLACK_BIT
+        if kind == PAWN:
+            return self._get_moves_pawn(index, player_color)
+        opponent_bit = color_bit(opposite_color(player_color))
+        move_generator = self._scan_rays(index, PIECE_RAYS[kind][index], opponent_bit, find_empty)
+        if kind == KING:
+            move_generator = chain(move_generator, self._get_castling_moves(index, player_color))
+        return move_generator
 
     def _is_self_check(self, player_color: Color,
                        start_coord: Tuple[int, int], end_coord: Tuple[int, int]) -> bool:
-        game_copy = deepcopy(self.game)
-        game_copy.move(start_coord, end_coord)
-        return game_copy.is_check(player_color)
+        self.game.make_move(start_coord, end_coord)
+        is_check = self.game.is_check(player_color)
+        self.game.unmake_move()
+        return is_check
+
+    def _get_pins_and_checkers(self, player_color: Color) -> Tuple[Dict[int, set], List[set]]:
+        """Find the pinned pieces (with the squares they may still move to) and the checking
+        pieces (with the squares that capture or block them) of player_color's king."""
+        squares = self.game.board.squares
+        player_bit, opponent_bit = color_bit(player_color), color_bit(opposite_color(player_color))
+        king_index = coord_to_index(self.game.kings[player_color].pos)
+        pins, checkers = {}, []
+        for sliders, rays in [((BISHOP | opponent_bit, QUEEN | opponent_bit), DIAGONAL_RAYS),
+                              ((ROOK | opponent_bit, QUEEN | opponent_bit), ORTHOGONAL_RAYS)]:
+            for ray in rays[king_index]:
+                line, pinned = set(), None
+                for look in ray:
+                    line.add(look)
+                    if squares[look] and squares[look] & BLACK_BIT == player_bit:
+                        if pinned is not None:
+                            break
+                        pinned = look
+                    elif squares[look]:
+                        if squares[look] in sliders:
+                            if pinned is None:
+                                checkers.append(line)
+                            else:
+                                pins[pinned] = line
+                        break
+        for look in KNIGHT_TARGETS[king_index]:
+            if squares[look] == KNIGHT | opponent_bit:
+                checkers.append({look})
+        for look in PAWN_CAPTURES[player_bit][king_index]:
+            if squares[look] == PAWN | opponent_bit:
+                checkers.append({look})
+        return pins, checkers
+
+    def _is_legal(self, player_color: Color, start_index: int, end_index: int,
+                  pins: Dict[int, set], checkers: List[set]) -> bool:
+        squares = self.game.board.squares
+        kind = squares[start_index] & ~BLACK_BIT
+        if kind == KING:
+            if abs(end_index - start_index) == 2:
+                return True
+            code, squares[start_index] = squares[start_index], EMPTY
+            is_attacked = self.game.board.is_attacked(end_index, color_bit(opposite_color(player_color)))
+            squares[start_index] = code
+            return not is_attacked
+        if len(checkers) > 1:
+            return False
+        if kind == PAWN and (end_index - start_index) % 16 and not squares[end_index]:
+            return not self._is_self_check(player_color, INDEX_COORDS[start_index], INDEX_COORDS[end_index])
+        if start_index in pins and end_index not in pins[start_index]:
+            return False
+        return not checkers or end_index in checkers[0]
 
     def get_moves(self, player_color: Color, skip_check: bool = False,
                   start_coord: Tuple[int, int] = None) -> Generator[Tuple[int, int], None, None]:
-        match_color = lambda coord: self.game.board[coord].color == player_color
-        match_pos = lambda coord: True if start_coord is None else coord == start_coord
-        for coord in filter_chain(self.game.board.keys(), match_pos, match_color):
-            for move in self._get_moves(coord, player_color):
-                if skip_check or not self._is_self_check(player_color, *move):
-                    yield move
+        if not skip_check:
+            pins, checkers = self._get_pins_and_checkers(player_color)
+        squares, player_bit = self.game.board.squares, color_bit(player_color)
+        start_indices = SQUARES if start_coord is None else [coord_to_index(start_coord)]
+        for index in start_indices:
+            if not squares[index] or squares[index] & BLACK_BIT != player_bit:
+                continue
+            for end_index in self._get_moves(index, player_color):
+                if skip_check or self._is_legal(player_color, index, end_index, pins, checkers):
+                    yield INDEX_COORDS[index], INDEX_COORDS[end_index]
+
+    def get_encoded_moves(self, player_color: Color) -> Generator[int, None, None]:
+        """Legal moves as 16-bit ints (see encode_move), one per promoting piece for pawns reaching
+        the last rank, without building any coordinate tuples."""
+        pins, checkers = self._get_pins_and_checkers(player_color)
+        squares, player_bit = self.game.board.squares, color_bit(player_color)
+        for index in SQUARES:
+            if not squares[index] or squares[index] & BLACK_BIT != player_bit:
+                continue
+            start = INDEX_SQUARES[index]
+            promotes = squares[index] & ~BLACK_BIT == PAWN
+            for end_index in self._get_moves(index, player_color):
+                if self._is_legal(player_color, index, end_index, pins, checkers):
+                    move = start | INDEX_SQUARES[end_index] << 6
+                    if promotes and end_index >> 4 in (0, 7):
+                        yield from (move | promotion << 12 for promotion in range(1, len(PROMOTIONS)))
+                    else:
+                        yield move
+
+    def get_moves_with_promotions(self, player_color: Color) -> Generator[Tuple, None, None]:
+        """Legal moves as (start_coord, end_coord, promote_func), one per promoting piece for pawns
+        reaching the last rank."""
+        squares = self.game.board.squares
+        for start_coord, end_coord in self.get_moves(player_color):
+            if end_coord[0] in [0, 7] and squares[coord_to_index(start_coord)] & ~BLACK_BIT == PAWN:
+                for short_name in "QRBN":
+                    yield start_coord, end_coord, piece_map[short_name]["create_func"]
+            else:
+                yield start_coord, end_coord, None
+
+
+class Profiler:
+    """Opt-in call counts and cumulative timings (callees included) for the hot paths. Enabling it
+    swaps timing wrappers in for the methods, so while it is off nothing is measured and nothing
+    is paid. Counts are shared by every game in the process."""
+
+    def __init__(self, targets: Dict[str, Tuple[type, str]]):
+        self.targets = targets
+        self.originals: Dict[str, LambdaType] = {}
+        self.calls = dict.fromkeys(targets, 0)
+        self.seconds = dict.fromkeys(targets, 0.0)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.originals)
+
+    def _wrap(self, label: str, function: LambdaType) -> LambdaType:
+        if isgeneratorfunction(function):
+            def timed_generator(*args, **kwargs):
+                # only the generator's own steps are timed, not the caller's work between them
+                self.calls[label] += 1
+                iterator, elapsed = function(*args, **kwargs), 0.0
+                try:
+                    while True:
+                        start = perf_counter()
+                        try:
+                            item = next(iterator)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += perf_counter() - start
+                        yield item
+                finally:
+                    self.seconds[label] += elapsed
+            return wraps(function)(timed_generator)
+
+        def timed(*args, **kwargs):
+            self.calls[label] += 1
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds[label] += perf_counter() - start
+        return wraps(function)(timed)
+
+    def enable(self):
+        for label, (owner, name) in self.targets.items():
+            if label not in self.originals:
+                self.originals[label] = owner.__dict__[name]
+                setattr(owner, name, self._wrap(label, self.originals[label]))
+
+    def disable(self):
+        for label, original in self.originals.items():
+            owner, name = self.targets[label]
+            setattr(owner, name, original)
+        self.originals.clear()
+
+    def reset(self):
+        self.calls = dict.fromkeys(self.targets, 0)
+        self.seconds = dict.fromkeys(self.targets, 0.0)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {label: {"calls": self.calls[label], "seconds": self.seconds[label]} for label in self.targets}
+
+    def summary(self) -> str:
+        lines = [" {:<26}{:>10}{:>12}{:>12}".format("", "calls", "total ms", "us/call")]
+        for label in sorted(self.targets, key=lambda label: -self.seconds[label]):
+            calls, seconds = self.calls[label], self.seconds[label]
+            lines.append(" {:<26}{:>10}{:>12.1f}{:>12.1f}".format(
+                label, calls, 1000 * seconds, 1e6 * seconds / calls if calls else 0.0))
+        return "\n".join(lines)
+
+
+PROFILER = Profiler({
+    "get_moves": (PotentialMoveGenerator, "get_moves"),
+    "get_moves_with_promotions": (PotentialMoveGenerator, "get_moves_with_promotions"),
+    "is_self_check": (PotentialMoveGenerator, "_is_self_check"),
+    "is_check": (Chess, "is_check"),
+    "is_checkmate": (Chess, "is_checkmate"),
+    "parse_move": (Chess, "parse_move"),
+    "make_move": (Chess, "make_move"),
+    "unmake_move": (Chess, "unmake_move"),
+    "deepcopy": (Chess, "__deepcopy__"),
+    "render": (TerminalRenderer, "render"),
+})
@@ -0,0 +1,133 @@
+from multiprocessing import Pool
+from time import perf_counter, time
+from typing import List, Optional, Tuple
+
+from . engine import MATE_SCORE, Engine, SearchResult, SearchTimeout, score_to_table
+from . game import Chess
+from . transposition import EXACT, pack_move, unpack_move
+
+_worker_engine: Optional[Engine] = None
+_worker_game: Tuple[bytes, Optional[Chess]] = (b"", None)
+
+
+def _init_worker(hash_mb: float):
+    global _worker_engine
+    _worker_engine = Engine(hash_mb=hash_mb)
+
+
+def _root_game(snapshot: bytes) -> Chess:
+    """The root position, restored once per search rather than once per task."""
+    global _worker_game
+    if _worker_game[0] != snapshot:
+        _worker_game = snapshot, Chess.from_snapshot(snapshot)
+    return _worker_game[1]
+
+
+def _search_root_move(task: Tuple[bytes, int, int, int, float]) -> Tuple[int, Optional[int], int]:
+    """Search one root move in a worker with a null window just above alpha, the best score so far:
+    the score that comes back is at most alpha when the move is no better, and above it when the
+    move fails high and needs a full search. The position travels as a Chess snapshot without its
+    moves (restored in constant time, repetition keys included) and the move as a packed 16-bit
+    int, the deadline as wall clock time shared by every process. Each worker keeps its engine and
+    transposition table for the life of the pool. Returns the move, its score (None if time ran
+    out) and the nodes searched."""
+    snapshot, packed_move, depth, alpha, deadline = task
+    if time() >= deadline:
+        return packed_move, None, 0
+    game = _root_game(snapshot)
+    engine = _worker_engine
+    engine.nodes, engine.deadline = 0, perf_counter() + (deadline - time())
+    game.make_move(*unpack_move(packed_move))
+    try:
+        score = -engine.negamax(game, depth - 1, -alpha - 1, -alpha, 1)
+    except SearchTimeout:
+        score = None
+    finally:
+        game.unmake_move()
+    return packed_move, score, engine.nodes
+
+
+class ParallelEngine:
+    """Root splitting search. Each iteration of iterative deepening searches the first (principal
+    variation) move in this process to get a bound, then hands the other root moves out to a pool
+    of worker processes to be searched with a null window against it; the few that fail high are
+    searched again here with a full window. Every process keeps its own Engine and transposition
+    table across iterations and searches."""
+
+    def __init__(self, workers: int, time_budget: float = 1.0, max_depth: int = 64, hash_mb: float = 16):
+        self.workers = workers
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.engine = Engine(hash_mb=hash_mb)
+        self.pool = Pool(workers, initializer=_init_worker, initargs=(hash_mb,))
+
+    def __enter__(self) -> "ParallelEngine":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def _search_move(self, game: Chess, move: Tuple, depth: int, alpha: int) -> int:
+        """Full window search of one root move above alpha, in this process."""
+        game.make_move(*move)
+        try:
+            return -self.engine.negamax(game, depth - 1, -MATE_SCORE - 1, -alpha, 1)
+        finally:
+            game.unmake_move()
+
+    def search(self, game: Chess) -> SearchResult:
+        start = perf_counter()
+        deadline = time() + self.time_budget
+        # the workers need the position and its repetition keys, not the moves that led to it
+        snapshot, engine = game.to_snapshot(with_history=False), self.engine
+        entry = engine.table.probe(game.zobrist_key) if engine.table is not None else None
+        moves = engine.ordered_moves(game, entry.move if entry is not None else None)
+        best_move, best_score, depth_reached, nodes = (moves[0] if moves else None), 0, 0, 0
+        for depth in range(1, self.max_depth + 1):
+            if len(moves) <= 1 or time() >= deadline:
+                break
+            engine.nodes, engine.deadline = 0, perf_counter() + (deadline - time())
+            try:
+                alpha = self._search_move(game, moves[0], depth, -MATE_SCORE - 1)
+                tasks = [(snapshot, pack_move(move), depth, alpha, deadline) for move in moves[1:]]
+                results: List[Tuple[int, Optional[int], int]] = list(
+                    self.pool.imap_unordered(_search_root_move, tasks))
+                nodes += sum(result[2] for result in results)
+                if any(result[1] is None for result in results):
+                    break
+                iteration_best = moves[0]
+                for packed_move, score, _ in sorted(results, key=lambda result: -result[1]):
+                    if score <= alpha:
+                        break
+                    move = unpack_move(packed_move)
+                    score = self._search_move(game, move, depth, alpha)
+                    if score > alpha:
+                        alpha, iteration_best = score, move
+            except SearchTimeout:
+                break
+            finally:
+                nodes += engine.nodes
+            best_move, best_score, depth_reached = iteration_best, alpha, depth
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+            if engine.table is not None:
+                engine.table.store(game.zobrist_key, depth, score_to_table(best_score, 0), EXACT, best_move)
+            if abs(best_score) >= MATE_SCORE - self.max_depth:
+                break
+        return SearchResult(best_move, best_score, depth_reached, nodes, perf_counter() - start)
+
+
+def benchmark(fen: str, depth: int, worker_counts: List[int]) -> List[Tuple[int, float, int, float]]:
+    """Time a fixed depth search with the serial Engine and then at each worker count; returns
+    (workers, seconds, nodes, speedup over the serial engine), with 0 workers for the serial run."""
+    serial = Engine(float("inf"), depth, hash_mb=1).search(Chess.from_fen(fen))
+    timings = [(0, serial.elapsed, serial.nodes)]
+    for workers in worker_counts:
+        with ParallelEngine(workers, time_budget=float("inf"), max_depth=depth, hash_mb=1) as engine:
+            result = engine.search(Chess.from_fen(fen))
+        timings.append((workers, result.elapsed, result.nodes))
+    return [(workers, elapsed, nodes, serial.elapsed / max(elapsed, 1e-9)) for workers, elapsed, nodes in timings]
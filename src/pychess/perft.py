@@ -0,0 +1,76 @@
+from time import perf_counter
+from typing import Dict, List, NamedTuple, TextIO
+import sys
+
+from . game import Chess, STARTING_FEN, format_move
+
+
+class PerftPosition(NamedTuple):
+    name: str
+    fen: str
+    counts: List[int]
+
+
+PERFT_SUITE = [
+    PerftPosition("initial", STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    PerftPosition("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                  [48, 2039, 97862, 4085603]),
+    PerftPosition("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    PerftPosition("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  [6, 264, 9467, 422333]),
+    PerftPosition("discovered check", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  [44, 1486, 62379, 2103487]),
+    PerftPosition("en passant gives check", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", [15, 126, 1928, 13931]),
+    PerftPosition("en passant exposes king", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", [18, 92, 1670, 10138]),
+    PerftPosition("short castling gives check", "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1", [13, 102, 1266, 10276]),
+    PerftPosition("promote out of check", "8/P1k5/K7/8/8/8/8/8 w - - 0 1", [6, 27, 273, 1329, 18135]),
+    PerftPosition("promote to give check", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", [9, 40, 472, 2661, 38983]),
+    PerftPosition("self stalemate", "K1k5/8/P7/8/8/8/8/8 w - - 0 1", [2, 6, 13, 63, 382, 2217]),
+    PerftPosition("underpromote to check", "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", [10, 25, 268, 926, 10857]),
+]
+
+
+def perft(game: Chess, depth: int) -> int:
+    if depth <= 0:
+        return 1
+    moves = list(game.move_generator.get_moves_with_promotions(game.player_color()))
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game.make_move(*move)
+        nodes += perft(game, depth - 1)
+        game.unmake_move()
+    return nodes
+
+
+def divide(game: Chess, depth: int) -> Dict[str, int]:
+    """Perft split by root move, keyed by the move in coordinate notation (e.g. e2e4, a7a8q)."""
+    results = {}
+    for move in list(game.move_generator.get_moves_with_promotions(game.player_color())):
+        game.make_move(*move)
+        results[format_move(*move)] = perft(game, depth - 1)
+        game.unmake_move()
+    return results
+
+
+def run_suite(max_depth: int = None, max_nodes: int = 100000, out: TextIO = None) -> bool:
+    """Run every suite position up to max_depth, skipping depths with more than max_nodes leaves.
+    Returns False if any node count does not match the expected value."""
+    out = sys.stdout if out is None else out
+    passed, total_nodes, total_time = True, 0, 0.0
+    for position in PERFT_SUITE:
+        for depth, expected in enumerate(position.counts, 1):
+            if (max_depth is not None and depth > max_depth) or expected > max_nodes:
+                break
+            start = perf_counter()
+            nodes = perft(Chess.from_fen(position.fen), depth)
+            elapsed = perf_counter() - start
+            total_nodes, total_time = total_nodes + nodes, total_time + elapsed
+            status = "ok" if nodes == expected else "FAIL (expected {})".format(expected)
+            passed = passed and nodes == expected
+            print(" {:<28} depth {} {:>10} nodes {:>9.0f} nodes/s {}".format(
+                position.name, depth, nodes, nodes / max(elapsed, 1e-9), status), file=out)
+    print(" total {} nodes in {:.2f}s, {:.0f} nodes/s".format(
+        total_nodes, total_time, total_nodes / max(total_time, 1e-9)), file=out)
+    return passed
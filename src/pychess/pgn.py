@@ -0,0 +1,84 @@
+from typing import Dict, Iterable, Iterator, List, NamedTuple, TextIO, Union
+import re
+
+from . game import Chess, GameSummary
+
+RESULTS = ["1-0", "0-1", "1/2-1/2", "*"]
+TAG_PAIR = re.compile(r'^\s*\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+TOKEN = re.compile(r'[{};()]|\$\d+|[^\s{};()$]+')
+MOVE_NUMBER = re.compile(r'^\d+\.+')
+ANNOTATION = re.compile(r'[!?]+$')
+
+
+class PgnGame(NamedTuple):
+    tags: Dict[str, str]
+    moves: List[str]
+    result: str
+
+
+def normalize_san(token: str) -> str:
+    token = ANNOTATION.sub("", MOVE_NUMBER.sub("", token))
+    return token.replace("0-0-0", "O-O-O").replace("0-0", "O-O")
+
+
+def parse_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    """Yield games from PGN text one at a time. Comments, NAGs, move numbers, annotation glyphs
+    and variations are dropped so only the mainline SAN moves are kept."""
+    tags, moves, result = {}, [], "*"
+    in_comment, variation_depth = False, 0
+    for line in lines:
+        if not in_comment and line.startswith("%"):
+            continue
+        tag_pair = TAG_PAIR.match(line) if not in_comment and not variation_depth else None
+        if tag_pair:
+            if moves:
+                yield PgnGame(tags, moves, result)
+                tags, moves, result = {}, [], "*"
+            tags[tag_pair.group(1)] = tag_pair.group(2).replace('\\"', '"').replace("\\\\", "\\")
+            continue
+        pos = 0
+        while pos < len(line):
+            if in_comment:
+                end = line.find("}", pos)
+                if end < 0:
+                    break
+                in_comment, pos = False, end + 1
+                continue
+            token = TOKEN.search(line, pos)
+            if token is None:
+                break
+            pos, token = token.end(), token.group()
+            if token == "{":
+                in_comment = True
+            elif token == ";":
+                break
+            elif token == "(":
+                variation_depth += 1
+            elif token == ")":
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth or token.startswith("$") or token == "}":
+                continue
+            elif token in RESULTS:
+                yield PgnGame(tags, moves, token)
+                tags, moves, result = {}, [], "*"
+            else:
+                token = normalize_san(token)
+                if token:
+                    moves.append(token)
+    if tags or moves:
+        yield PgnGame(tags, moves, result)
+
+
+def read_games(source: Union[str, TextIO], buffer_size: int = 1 << 16) -> Iterator[PgnGame]:
+    """Stream games from a PGN file path or open text file; only the current game is held in memory."""
+    if not isinstance(source, str):
+        yield from parse_games(source)
+        return
+    with open(source, encoding="utf-8", errors="replace", buffering=buffer_size) as pgn_file:
+        yield from parse_games(pgn_file)
+
+
+def replay(game: PgnGame, stop_on_error: bool = True) -> GameSummary:
+    """Play a PGN game's moves through Chess, starting from its FEN tag if it has one."""
+    chess = Chess.from_fen(game.tags["FEN"]) if "FEN" in game.tags else Chess()
+    return chess.play_moves(game.moves, stop_on_error)
@@ -0,0 +1,160 @@
+from asyncio import StreamReader, StreamWriter, gather, get_running_loop, open_connection, start_server
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Tuple
+import asyncio
+import json
+
+from . game import Chess
+
+DEFAULT_PORT = 8765
+
+
+def game_state(game: Chess, ok: bool = True, message: str = "") -> Dict[str, Any]:
+    return {
+        "ok": ok,
+        "message": message,
+        "fen": game.to_fen(),
+        "done": game.done,
+        "winner": game.winner.name if game.winner is not None else None,
+    }
+
+
+def parse_snapshot(snapshot: bytes, move: str) -> Tuple:
+    """Check a move against a position shipped as a snapshot, for executor workers."""
+    return Chess.from_snapshot(snapshot).parse_move(move)
+
+
+class GameServer:
+    """Hosts one game per connection on a single event loop. The line protocol takes a SAN move,
+    "new [FEN]" or "quit" and answers every line with a JSON line of the result and the position.
+    With workers, moves are checked in a process pool (the position travels as a snapshot) so a
+    slow position can't hold up the other connections; the checked move is then played on the
+    connection's own game, which keeps the history repetition draws are judged by."""
+
+    def __init__(self, workers: int = 0):
+        self.executor = ProcessPoolExecutor(workers) if workers else None
+        self.connections = self.moves = 0
+
+    async def play(self, game: Chess, move: str) -> Tuple[bool, str]:
+        if self.executor is None:
+            return game.play_move(move)
+        snapshot = game.to_snapshot(with_history=False)
+        parsed = await get_running_loop().run_in_executor(self.executor, parse_snapshot, snapshot, move)
+        if not parsed[0]:
+            return False, parsed[1]
+        return True, game.play_parsed(parsed)
+
+    async def handle(self, reader: StreamReader, writer: StreamWriter):
+        self.connections += 1
+        game = Chess()
+        writer.write((json.dumps(game_state(game, message="new game")) + "\n").encode())
+        try:
+            async for line in reader:
+                command = line.decode(errors="replace").strip()
+                if not command:
+                    continue
+                if command == "quit":
+                    break
+                if command == "new" or command.startswith("new "):
+                    try:
+                        game = Chess.from_fen(command[4:]) if command[4:].strip() else Chess()
+                        state = game_state(game, message="new game")
+                    except ValueError as error:
+                        state = game_state(game, False, str(error))
+                elif game.done:
+                    state = game_state(game, False, "game is over")
+                else:
+                    played, message = await self.play(game, command)
+                    self.moves += played
+                    state = game_state(game, played, message)
+                writer.write((json.dumps(state) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+        return await start_server(self.handle, host, port)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def random_game(seed: int, max_moves: int = 80) -> List[str]:
+    """SAN moves of a random legal game, for driving load without thinking about moves."""
+    game, random, moves = Chess(), Random(seed), []
+    while len(moves) < max_moves:
+        legal = list(game.move_generator.get_moves_with_promotions(game.player_color()))
+        if not legal:
+            break
+        move = game.san(*random.choice(legal))
+        moves.append(move)
+        game.play_move(move)
+        if game.done:
+            break
+    return moves
+
+
+class LoadReport(NamedTuple):
+    moves: int
+    errors: int
+    elapsed: float
+    latencies: List[float]
+
+    @property
+    def moves_per_second(self) -> float:
+        return self.moves / max(self.elapsed, 1e-9)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+async def run_client(host: str, port: int, games: List[List[str]], latencies: List[float]) -> int:
+    """Play games over one connection, recording each move's round trip; returns rejected moves."""
+    reader, writer = await open_connection(host, port)
+    errors = 0
+    await reader.readline()
+    for number, moves in enumerate(games):
+        if number:
+            writer.write(b"new\n")
+            await reader.readline()
+        for move in moves:
+            start = perf_counter()
+            writer.write((move + "\n").encode())
+            response = json.loads(await reader.readline())
+            latencies.append(perf_counter() - start)
+            errors += not response["ok"]
+    writer.write(b"quit\n")
+    writer.close()
+    return errors
+
+
+async def load_test(host: str = "127.0.0.1", port: int = DEFAULT_PORT, clients: int = 50, games: int = 2,
+                    seed: int = 0) -> LoadReport:
+    """Drive the server with concurrent clients each playing random games; the games are made up
+    before the clock starts so only the server's work is measured."""
+    pool = [random_game(seed + number) for number in range(min(clients * games, 32))]
+    schedule = [[pool[(client * games + number) % len(pool)] for number in range(games)] for client in range(clients)]
+    latencies: List[float] = []
+    start = perf_counter()
+    errors = await gather(*[run_client(host, port, client_games, latencies) for client_games in schedule])
+    return LoadReport(len(latencies), sum(errors), perf_counter() - start, latencies)
+
+
+async def serve_forever(host: str, port: int, workers: int = 0):
+    game_server = GameServer(workers)
+    server = await game_server.serve(host, port)
+    print(" serving games on {}:{}".format(host, port), flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
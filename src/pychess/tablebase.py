@@ -0,0 +1,288 @@
+from mmap import ACCESS_READ, mmap
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, TextIO, Tuple
+import os
+import sys
+
+from . game import BLACK_BIT, KING, KING_TARGETS, PAWN, PAWN_CAPTURES, PIECE_RAYS, QUEEN, ROOK, SQUARES, WHITE_BIT, \
+    Chess, color_bit
+
+MAGIC = b"PYTB"
+VERSION = 1
+HEADER_BYTES = 8  # magic, version, material name
+# one byte per position: 0 is a draw, otherwise the low 7 bits are the plies to mate and the high bit
+# is set when the side to move is the one getting mated
+DRAW, LOSS_BIT, ILLEGAL = 0, 0x80, 0xFF
+WHITE, BLACK = 0, 1  # side to move, where white is always the side with the extra piece
+
+
+def _square(index: int) -> int:
+    return (index >> 4) * 8 + (index & 7)
+
+
+# the board's 0x88 move tables on plain 0-63 squares, rank 8 first like the board coordinates
+KING_MOVES = [tuple(_square(target) for target in KING_TARGETS[index]) for index in SQUARES]
+SLIDER_RAYS = {kind: [tuple(tuple(_square(target) for target in ray) for ray in PIECE_RAYS[kind][index])
+                      for index in SQUARES] for kind in [QUEEN, ROOK]}
+PAWN_ATTACKS = [tuple(_square(target) for target in PAWN_CAPTURES[WHITE_BIT][index]) for index in SQUARES]
+
+# without pawns the strong king is mirrored into the a8-d8-d5 triangle, with one only the pawn's file
+# is mirrored into the a-d files
+TRIANGLE = [rank * 8 + file for rank in range(4) for file in range(rank + 1)]
+TRIANGLE_INDEX = {square: number for number, square in enumerate(TRIANGLE)}
+PAWN_SQUARES = [rank * 8 + file for rank in range(1, 7) for file in range(4)]
+PAWN_INDEX = {square: number for number, square in enumerate(PAWN_SQUARES)}
+
+
+def _pawnless_index(turn: int, strong_king: int, weak_king: int, piece: int) -> int:
+    if strong_king & 7 > 3:
+        strong_king, weak_king, piece = strong_king ^ 7, weak_king ^ 7, piece ^ 7
+    if strong_king >> 3 > 3:
+        strong_king, weak_king, piece = strong_king ^ 56, weak_king ^ 56, piece ^ 56
+    if strong_king & 7 > strong_king >> 3:
+        strong_king, weak_king, piece = [(square & 7) << 3 | square >> 3 for square in [strong_king, weak_king, piece]]
+    return ((turn * len(TRIANGLE) + TRIANGLE_INDEX[strong_king]) * 64 + weak_king) * 64 + piece
+
+
+def _pawnless_position(index: int) -> Tuple[int, int, int, int]:
+    rest = index >> 12
+    return rest // len(TRIANGLE), TRIANGLE[rest % len(TRIANGLE)], index >> 6 & 63, index & 63
+
+
+def _pawn_index(turn: int, strong_king: int, weak_king: int, piece: int) -> int:
+    if piece & 7 > 3:
+        strong_king, weak_king, piece = strong_king ^ 7, weak_king ^ 7, piece ^ 7
+    return ((turn * len(PAWN_SQUARES) + PAWN_INDEX[piece]) * 64 + strong_king) * 64 + weak_king
+
+
+def _pawn_position(index: int) -> Tuple[int, int, int, int]:
+    rest = index >> 12
+    return rest // len(PAWN_SQUARES), index >> 6 & 63, index & 63, PAWN_SQUARES[rest % len(PAWN_SQUARES)]
+
+
+class Material(NamedTuple):
+    kind: int
+    size: int
+    index: Callable[[int, int, int, int], int]
+    position: Callable[[int], Tuple[int, int, int, int]]
+
+
+MATERIALS = {
+    "KQK": Material(QUEEN, 2 * len(TRIANGLE) * 64 * 64, _pawnless_index, _pawnless_position),
+    "KRK": Material(ROOK, 2 * len(TRIANGLE) * 64 * 64, _pawnless_index, _pawnless_position),
+    "KPK": Material(PAWN, 2 * len(PAWN_SQUARES) * 64 * 64, _pawn_index, _pawn_position),
+}
+PROMOTION_TABLES = ["KQK", "KRK"]
+
+
+class TablebaseResult(NamedTuple):
+    wdl: int  # 1 when the side to move wins, -1 when it loses, 0 for a draw
+    distance: int  # plies to mate, 0 for a draw
+
+
+def _attacks(kind: int, piece: int, target: int, blocker: int) -> bool:
+    """Whether the strong side's piece attacks target, with only the strong king blocking its rays
+    (the weak king is either the target or moving along the ray away from it)."""
+    if kind == PAWN:
+        return target in PAWN_ATTACKS[piece]
+    for ray in SLIDER_RAYS[kind][piece]:
+        for square in ray:
+            if square == target:
+                return True
+            if square == blocker:
+                break
+    return False
+
+
+def _is_legal(kind: int, turn: int, strong_king: int, weak_king: int, piece: int) -> bool:
+    if len({strong_king, weak_king, piece}) < 3 or weak_king in KING_MOVES[strong_king]:
+        return False
+    return turn == BLACK or not _attacks(kind, piece, weak_king, strong_king)
+
+
+def _strong_moves(kind: int, strong_king: int, weak_king: int, piece: int) -> Tuple[List[Tuple], List[int]]:
+    """Positions (black to move) after each strong side move, and the squares its pawn can promote on."""
+    moves, promotions = [], []
+    weak_guards = KING_MOVES[weak_king]
+    for target in KING_MOVES[strong_king]:
+        if target != piece and target not in weak_guards:
+            moves.append((BLACK, target, weak_king, piece))
+    if kind == PAWN:
+        target = piece - 8
+        if target not in (strong_king, weak_king):
+            if target < 8:
+                promotions.append(target)
+            else:
+                moves.append((BLACK, strong_king, weak_king, target))
+                if piece >= 48 and target - 8 not in (strong_king, weak_king):
+                    moves.append((BLACK, strong_king, weak_king, target - 8))
+        return moves, promotions
+    for ray in SLIDER_RAYS[kind][piece]:
+        for target in ray:
+            if target in (strong_king, weak_king):
+                break
+            moves.append((BLACK, strong_king, weak_king, target))
+    return moves, promotions
+
+
+def _weak_moves(kind: int, strong_king: int, weak_king: int, piece: int) -> Tuple[List[Tuple], bool]:
+    """Positions (white to move) after each lone king move, and whether it can take the piece."""
+    moves, can_capture = [], False
+    strong_guards = KING_MOVES[strong_king]
+    for target in KING_MOVES[weak_king]:
+        if target in strong_guards:
+            continue
+        if target == piece:
+            can_capture = True
+        elif not _attacks(kind, piece, target, strong_king):
+            moves.append((WHITE, strong_king, target, piece))
+    return moves, can_capture
+
+
+def generate(material: str, solved: Optional[Dict[str, bytearray]] = None) -> bytearray:
+    """Solve an ending by retrograde analysis. Mated positions are the seeds; a position with the
+    strong side to move is won one ply after any of its successors is lost, and a lone king position
+    is lost once every one of its moves has been counted off as leading to a win. Promotions look up
+    the solved KQK and KRK tables."""
+    kind, size, index_of, position_of = MATERIALS[material]
+    values = bytearray([ILLEGAL]) * size
+    predecessors: List[List[int]] = [[] for _ in range(size)]
+    moves_left = [0] * size
+    buckets: List[List[int]] = [[] for _ in range(LOSS_BIT)]
+    for index in range(size):
+        turn, strong_king, weak_king, piece = position_of(index)
+        if not _is_legal(kind, turn, strong_king, weak_king, piece):
+            continue
+        values[index] = DRAW
+        if turn == WHITE:
+            moves, promotions = _strong_moves(kind, strong_king, weak_king, piece)
+            for square, promoted in [(square, name) for square in promotions for name in PROMOTION_TABLES]:
+                value = solved[promoted][_pawnless_index(BLACK, strong_king, weak_king, square)]
+                if value & LOSS_BIT and value != ILLEGAL:
+                    buckets[(value & ~LOSS_BIT) + 1].append(index)
+        else:
+            moves, can_capture = _weak_moves(kind, strong_king, weak_king, piece)
+            moves_left[index] = -1 if can_capture else len(moves)
+            if not moves and not can_capture and _attacks(kind, piece, weak_king, strong_king):
+                buckets[0].append(index)
+        for move in moves:
+            predecessors[index_of(*move)].append(index)
+    for distance, bucket in enumerate(buckets):
+        for index in bucket:
+            if values[index] != DRAW:
+                continue
+            if index >= size // 2:
+                values[index] = LOSS_BIT | distance
+                buckets[distance + 1].extend(previous for previous in predecessors[index] if values[previous] == DRAW)
+                continue
+            values[index] = distance
+            for previous in predecessors[index]:
+                if moves_left[previous] > 0:
+                    moves_left[previous] -= 1
+                    if not moves_left[previous]:
+                        buckets[distance + 1].append(previous)
+    return values
+
+
+def write_table(path: str, material: str, values: bytearray):
+    with open(path, "wb") as table_file:
+        table_file.write(MAGIC + bytes([VERSION]) + material.encode())
+        table_file.write(values)
+
+
+def generate_tables(directory: str, materials: Optional[Iterable[str]] = None,
+                    out: Optional[TextIO] = None) -> Dict[str, Tuple[int, float]]:
+    """Generate and write the tables for materials (all by default) into directory as NAME.tb,
+    reporting positions per second. Returns material -> (positions, seconds)."""
+    out = out or sys.stdout
+    wanted = set(materials or MATERIALS)
+    os.makedirs(directory, exist_ok=True)
+    solved, timings = {}, {}
+    for material in MATERIALS:
+        if material not in wanted and not (material in PROMOTION_TABLES and "KPK" in wanted):
+            continue
+        start = perf_counter()
+        solved[material] = generate(material, solved)
+        elapsed = perf_counter() - start
+        if material in wanted:
+            write_table(os.path.join(directory, material + ".tb"), material, solved[material])
+            timings[material] = (len(solved[material]), elapsed)
+            print(" {} {} positions in {:.2f}s, {:.0f} positions/s".format(
+                material, len(solved[material]), elapsed, len(solved[material]) / max(elapsed, 1e-9)), file=out)
+    return timings
+
+
+class Tablebase:
+    """Probes the tables in a directory of generated NAME.tb files. Each file is memory mapped the
+    first time a position with its material is probed, and a probe is one byte read."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tables: Dict[str, Optional[mmap]] = {}
+
+    def __enter__(self) -> "Tablebase":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table.close()
+        self.tables.clear()
+
+    def table(self, material: str) -> Optional[mmap]:
+        if material not in self.tables:
+            path = os.path.join(self.directory, material + ".tb")
+            if not os.path.isfile(path):
+                self.tables[material] = None
+                return None
+            with open(path, "rb") as table_file:
+                table = mmap(table_file.fileno(), 0, access=ACCESS_READ)
+            if table[:HEADER_BYTES] != MAGIC + bytes([VERSION]) + material.encode() \
+                    or len(table) != HEADER_BYTES + MATERIALS[material].size:
+                table.close()
+                raise ValueError("{} is not a {} table".format(path, material))
+            self.tables[material] = table
+        return self.tables[material]
+
+    def probe(self, game: Chess) -> Optional[TablebaseResult]:
+        """Result for the side to move, or None when the position isn't covered by a table here."""
+        squares = game.board.squares
+        occupied = [index for index in SQUARES if squares[index]]
+        if len(occupied) == 2:
+            return TablebaseResult(0, 0)
+        if len(occupied) != 3 or game.castling_rights():
+            return None
+        extra = [index for index in occupied if squares[index] & ~BLACK_BIT != KING][0]
+        strong_bit = squares[extra] & BLACK_BIT
+        material = "K{}K".format("PNBRQ"[(squares[extra] & ~BLACK_BIT) - PAWN])
+        table = self.table(material) if material in MATERIALS else None
+        if table is None:
+            return None
+        flip = 56 if strong_bit == BLACK_BIT else 0
+        kings = {squares[index] & BLACK_BIT: _square(index) ^ flip for index in occupied if index != extra}
+        turn = WHITE if color_bit(game.player_color()) == strong_bit else BLACK
+        value = table[HEADER_BYTES + MATERIALS[material].index(
+            turn, kings[strong_bit], kings[strong_bit ^ BLACK_BIT], _square(extra) ^ flip)]
+        if value == ILLEGAL:
+            return None
+        if value & LOSS_BIT:
+            return TablebaseResult(-1, value & ~LOSS_BIT)
+        return TablebaseResult(1 if value else 0, value)
+
+    def best_move(self, game: Chess) -> Optional[Tuple]:
+        """The move that wins fastest, holds the draw or loses slowest, as (start_coord, end_coord,
+        promote_func)."""
+        best_move, best_score = None, None
+        for move in game.move_generator.get_moves_with_promotions(game.player_color()):
+            game.make_move(*move)
+            try:
+                result = self.probe(game)
+            finally:
+                game.unmake_move()
+            score = 0 if result is None else -result.wdl * (LOSS_BIT - result.distance)
+            if best_score is None or score > best_score:
+                best_move, best_score = move, score
+        return best_move
@@ -0,0 +1,74 @@
+from array import array
+from typing import NamedTuple, Optional, Tuple
+
+from . game import decode_move, encode_move
+
+EXACT, LOWER_BOUND, UPPER_BOUND = range(1, 4)
+ENTRY_BYTES = 16  # key 8, score 4, move 2, depth 1, bound 1
+
+
+def pack_move(move: Optional[Tuple]) -> int:
+    """16 bit move (see pychess.game.encode_move), 0 for no move."""
+    return 0 if move is None else encode_move(*move)
+
+
+def unpack_move(packed: int) -> Optional[Tuple]:
+    return decode_move(packed) if packed else None
+
+
+class TableEntry(NamedTuple):
+    depth: int
+    score: int
+    bound: int
+    move: Optional[Tuple]
+
+
+class TranspositionTable:
+    """Fixed size hash table of search results held in preallocated arrays. Each bucket has two
+    slots: the first keeps the deepest result seen for its positions, the second always takes the
+    newest, so deep results survive while recent ones still get stored."""
+
+    def __init__(self, size_mb: float = 16):
+        self.buckets = max(int(size_mb * 1024 * 1024) // (ENTRY_BYTES * 2), 1)
+        slots = self.buckets * 2
+        self.keys = array("Q", bytes(8 * slots))
+        self.scores = array("i", bytes(4 * slots))
+        self.moves = array("H", bytes(2 * slots))
+        self.depths = array("b", bytes(slots))
+        self.bounds = array("B", bytes(slots))
+        self.probes = self.hits = self.stores = 0
+
+    def __len__(self) -> int:
+        return sum(1 for bound in self.bounds if bound)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def clear(self):
+        for table in [self.keys, self.scores, self.moves, self.depths, self.bounds]:
+            table[:] = array(table.typecode, bytes(table.itemsize * len(table)))
+        self.probes = self.hits = self.stores = 0
+
+    def probe(self, key: int) -> Optional[TableEntry]:
+        self.probes += 1
+        first = key % self.buckets * 2
+        for slot in [first, first + 1]:
+            if self.bounds[slot] and self.keys[slot] == key:
+                self.hits += 1
+                return TableEntry(self.depths[slot], self.scores[slot], self.bounds[slot],
+                                  unpack_move(self.moves[slot]))
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: Optional[Tuple]):
+        self.stores += 1
+        slot = key % self.buckets * 2
+        # a shallower result goes to the always-replace slot, unless it is an exact score for the same position
+        if self.bounds[slot] and depth < self.depths[slot] and (self.keys[slot] != key or bound != EXACT):
+            slot += 1
+        self.keys[slot], self.scores[slot], self.moves[slot] = key, score, pack_move(move)
+        self.depths[slot], self.bounds[slot] = max(min(depth, 127), -128), bound
+
+    def stats(self) -> str:
+        return "{} probes, {} hits ({:.1%}), {} stores, {}/{} slots used".format(
+            self.probes, self.hits, self.hit_rate, self.stores, len(self), self.buckets * 2)
@@ -0,0 +1,95 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from glob import glob
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+
+from . game import Chess, GameSummary
+from . pgn import PgnGame, read_games, replay
+
+GameItem = Tuple[str, Optional[PgnGame]]
+
+
+def find_games(path: str) -> List[str]:
+    """Every regular file directly inside a directory, or every file matching a glob pattern."""
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in os.listdir(path) if not name.startswith(".")]
+    else:
+        paths = glob(path, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def iter_game_items(paths: Iterable[str]) -> Iterator[GameItem]:
+    """Move-list files are read by the worker; .pgn databases are streamed here one game at a time
+    and labelled path#number."""
+    for path in paths:
+        if path.lower().endswith(".pgn"):
+            for number, game in enumerate(read_games(path), 1):
+                yield "{}#{}".format(path, number), game
+        else:
+            yield path, None
+
+
+def summary_result(label: str, summary: GameSummary) -> Dict[str, Any]:
+    illegal_number, illegal_move, message = summary.errors[0] if summary.errors else (None, None, None)
+    return {
+        "path": label,
+        "moves": summary.moves_played,
+        "turn": summary.turn,
+        "done": summary.done,
+        "winner": summary.winner.name if summary.winner is not None else None,
+        "illegal_move_number": illegal_number,
+        "illegal_move": illegal_move,
+        "message": message,
+    }
+
+
+def validate_game(path: str) -> Dict[str, Any]:
+    with open(path) as moves:
+        return summary_result(path, Chess().play_moves(moves))
+
+
+def validate_item(item: GameItem) -> Dict[str, Any]:
+    """The result of one game; a game that can't be read or set up comes back as an error row
+    ({"path", "error"}) so the rest of the run carries on."""
+    label, pgn_game = item
+    try:
+        if pgn_game is None:
+            return validate_game(label)
+        result = summary_result(label, replay(pgn_game))
+    except (OSError, ValueError) as error:
+        return {"path": label, "error": str(error)}
+    result["result"] = pgn_game.result
+    return result
+
+
+def validate_chunk(items: List[GameItem]) -> List[Dict[str, Any]]:
+    return [validate_item(item) for item in items]
+
+
+def map_chunks(function: Callable[[List], List], chunks: Iterable[List], jobs: int = 1) -> Iterator:
+    """Run function over chunks across a process pool, yielding each chunk's results as it completes.
+    At most a few chunks per worker are queued at once so huge inputs don't build a huge backlog of
+    futures."""
+    if jobs <= 1:
+        for chunk in chunks:
+            yield from function(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = set()
+        for chunk in chunks:
+            pending.add(executor.submit(function, chunk))
+            if len(pending) >= jobs * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def validate_games(paths: Iterable[str], jobs: int = 1, chunk_size: int = 16) -> Iterator[Dict[str, Any]]:
+    """Validate games across a process pool, yielding results as chunks complete."""
+    items = iter_game_items(paths)
+    return map_chunks(validate_chunk, iter(lambda: list(islice(items, chunk_size)), []), jobs)
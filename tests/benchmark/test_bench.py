@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from pychess.bench import load_baseline, regressions, run_bench
+
+# the gate is opt-in: throughput depends on the machine, so it only runs against a baseline named here
+BASELINE = os.environ.get("PYCHESS_BENCH_BASELINE")
+TOLERANCE = float(os.environ.get("PYCHESS_BENCH_TOLERANCE", "10"))
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    class Benchmark:
+        """The part of pytest-benchmark's fixture used here, so the gate runs without the plugin."""
+
+        def __init__(self):
+            self.extra_info = {}
+
+        def pedantic(self, target, args=(), kwargs=None, rounds=1, iterations=1):
+            for _ in range(rounds * iterations):
+                result = target(*args, **(kwargs or {}))
+            return result
+
+    @pytest.fixture
+    def benchmark():
+        return Benchmark()
+
+
+@pytest.mark.skipif(not BASELINE, reason="set PYCHESS_BENCH_BASELINE to a saved baseline to gate throughput")
+class TestBench:
+    """Gating self-play throughput against a baseline saved with pychess bench --save-baseline and
+    named by PYCHESS_BENCH_BASELINE. PYCHESS_BENCH_TOLERANCE sets the allowed drop in percent."""
+
+    def test_self_play_throughput(self, benchmark):
+        baseline = load_baseline(BASELINE)
+        report = benchmark.pedantic(run_bench, kwargs={"games": baseline["games"]}, rounds=1, iterations=1)
+        benchmark.extra_info.update(report.to_dict())
+        assert report.moves == baseline["moves"]
+        assert not regressions(report, baseline, TOLERANCE)
@@ -52,3 +52,24 @@ class TestChessLogic:
     def test_kingside_castling(self, chess_game):
         assert_piece(chess_game.board[7, 5], "rook", Color.WHITE)
         assert_piece(chess_game.board[7, 6], "king", Color.WHITE)
+
+
+class TestHeadlessReplay:
+    """Testing that headless replay reaches the same states as the interactive loop."""
+
+    @pytest.mark.parametrize("file_path", [BYRNE_FISCHER_NEW_YORK_1956])
+    def test_play_moves_matches_start(self, chess_game, file_path):
+        game = Chess()
+        with open(file_path) as moves:
+            summary = game.play_moves(moves)
+        assert summary.errors == []
+        assert summary.done and summary.winner == Color.BLACK
+        assert summary.turn == chess_game.turn == 83
+        assert summary.moves_played == 82
+        assert summary.last_message.startswith("(checkmate)")
+
+    def test_play_moves_collects_errors(self):
+        summary = Chess().play_moves(["e4", "e4", "", "e5", "Ke2", "Ke7"])
+        assert [(number, move) for number, move, _ in summary.errors] == [(2, "e4")]
+        assert summary.moves_played == 4
+        assert not summary.done
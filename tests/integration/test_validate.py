@@ -0,0 +1,43 @@
+from pychess.validate import find_games, validate_games
+
+TEST_RESOURCES = "tests/resources"
+
+
+class TestValidate:
+    """Testing multi-game validation across worker processes."""
+
+    def test_resources_are_valid(self):
+        paths = [path for path in find_games(TEST_RESOURCES) if not path.endswith(".pgn")]
+        assert len(paths) == 4
+        results = {result["path"]: result for result in validate_games(paths, jobs=2, chunk_size=1)}
+        assert sorted(results) == paths
+        assert all(result["illegal_move"] is None for result in results.values())
+        assert results[f"{TEST_RESOURCES}/fools_mate"]["winner"] == "black"
+        assert results[f"{TEST_RESOURCES}/byrne_fischer_new_york_1956"]["turn"] == 83
+
+    def test_reports_first_illegal_move(self, tmp_path):
+        (tmp_path / "game").write_text("e4\ne5\nKe3\nKe2\n")
+        (result,) = validate_games(find_games(str(tmp_path / "*")))
+        assert result["illegal_move_number"] == 3
+        assert result["illegal_move"] == "Ke3"
+        assert result["message"] == "invalid move: Ke3"
+        assert result["moves"] == 3
+
+    def test_pgn_games_are_streamed(self):
+        results = sorted(validate_games([f"{TEST_RESOURCES}/games.pgn"], jobs=2, chunk_size=1),
+                         key=lambda result: result["path"])
+        assert [result["path"][-2:] for result in results] == ["#1", "#2", "#3", "#4"]
+        assert [result["winner"] for result in results] == ["black", "white", "white", None]
+        assert [result["result"] for result in results] == ["0-1", "1-0", "1-0", "*"]
+        assert results[3]["illegal_move"] == "Ke3"
+
+    def test_unreadable_games_are_error_rows(self, tmp_path):
+        (tmp_path / "binary").write_bytes(b"e4\n\xff\xfe\n")
+        (tmp_path / "game").write_text("e4\ne5\n")
+        (tmp_path / "games.pgn").write_text('[FEN "not a position"]\n\n1. e4 *\n\n1. d4 d5 *\n')
+        paths = find_games(str(tmp_path))
+        results = {result["path"]: result for result in validate_games(paths, jobs=2, chunk_size=1)}
+        assert sorted(results) == [str(tmp_path / name) for name in ["binary", "game", "games.pgn#1", "games.pgn#2"]]
+        assert "error" in results[str(tmp_path / "binary")] and "error" in results[str(tmp_path / "games.pgn#1")]
+        assert results[str(tmp_path / "game")]["moves"] == 2
+        assert results[str(tmp_path / "games.pgn#2")]["moves"] == 2
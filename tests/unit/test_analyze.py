@@ -0,0 +1,58 @@
+from io import BytesIO
+
+import pytest
+
+from pychess.analyze import CHECK, CHECKMATE, INVALID, ColumnWriter, analyze_chunk, analyze_positions, evaluate_codes, \
+    read_columns
+from pychess.engine import evaluate
+from pychess.game import SQUARES, Chess, STARTING_FEN
+
+POSITIONS = [
+    "# start position, then an EPD record, mate, stalemate and a broken line",
+    STARTING_FEN,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - bm Qxf6; id "kiwipete";',
+    "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3",
+    "",
+    "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1",
+    "not a position",
+]
+
+
+class TestAnalyze:
+    """Testing batch position analysis."""
+
+    def test_positions(self):
+        results = {result["line"]: result for result in analyze_positions(POSITIONS, chunk_size=2)}
+        assert sorted(results) == [2, 3, 4, 6, 7]
+        assert results[2] == {"line": 2, "id": None, "moves": 20, "check": False, "status": "ongoing", "flags": 0,
+                              "eval": 0}
+        assert results[3]["id"] == "kiwipete" and results[3]["moves"] == 48
+        assert results[4]["status"] == "checkmate" and results[4]["flags"] == CHECK | CHECKMATE
+        assert results[6]["status"] == "stalemate" and not results[6]["check"]
+        assert results[7] == {"line": 7, "error": "invalid FEN: not a position"}
+        assert sorted(result["line"] for result in analyze_positions(POSITIONS, jobs=2, chunk_size=1)) == \
+            sorted(results)
+
+    def test_evaluation_matches_engine(self):
+        games = [Chess.from_fen(line) for line in [POSITIONS[3], POSITIONS[5], "4k3/8/8/3q4/8/2N5/8/4K3 b - - 0 1"]]
+        codes = b"".join(bytes(game.board.squares[index] for index in SQUARES) for game in games)
+        assert evaluate_codes(codes) == [evaluate(game) * (1 if game.player_turn() else -1) for game in games]
+
+    def test_piece_planes(self):
+        pytest.importorskip("numpy")
+        from pychess.analyze import piece_planes
+        planes = piece_planes(bytes(Chess().board.squares[index] for index in SQUARES))
+        assert planes.shape == (1, 12, 64)
+        assert planes[0, 0].sum() == 8 and planes[0, 0, 48:56].all() and planes[0, 11, 4]
+
+    def test_columns(self):
+        out = BytesIO()
+        writer = ColumnWriter(out)
+        writer.write(analyze_chunk(list(enumerate(POSITIONS[1:4], 2))))
+        writer.write(analyze_chunk([(7, POSITIONS[6])]))
+        first, second = read_columns(out.getvalue())
+        assert first["line"].tolist() == [2, 3, 4] and first["moves"].tolist() == [20, 48, 0]
+        assert first["flags"].tolist() == [0, 0, CHECK | CHECKMATE]
+        assert second["flags"].tolist() == [INVALID] and second["eval"].tolist() == [0]
+        with pytest.raises(ValueError):
+            next(read_columns(b"nope!"))
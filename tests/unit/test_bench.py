@@ -0,0 +1,24 @@
+from pychess.bench import BenchReport, regressions, run_bench, self_play
+
+
+class TestBench:
+    """Testing the self-play benchmark and its baseline comparison."""
+
+    def test_self_play_is_seeded(self):
+        latencies = []
+        played, elapsed = self_play(3, latencies=latencies)
+        assert played == len(latencies) and elapsed > 0
+        assert self_play(3)[0] == played
+
+    def test_report(self):
+        report = run_bench(games=2, seed=5)
+        assert report.games == 2 and report.moves == self_play(5)[0] + self_play(6)[0]
+        assert report.mean_parse > 0 and report.percentile(0.99) <= max(report.parse_latencies)
+        assert sorted(report.to_dict()) == ["elapsed", "games", "games_per_second", "mean_parse_us", "moves",
+                                            "moves_per_second", "p99_parse_us", "peak_rss_kb"]
+
+    def test_regressions(self):
+        report = BenchReport(10, 1000, 1.0, [], None)
+        assert not regressions(report, {"games_per_second": 11, "moves_per_second": 1100}, 10)
+        (failure,) = regressions(report, {"games_per_second": 12, "moves_per_second": 1000}, 10)
+        assert failure.startswith("games_per_second 10.0 is more than 10% below")
@@ -0,0 +1,82 @@
+from random import Random
+from struct import pack
+
+from pychess.book import OpeningBook, polyglot_key
+from pychess.engine import Engine
+from pychess.game import Chess, Queen
+
+
+def polyglot_move(start: str, end: str, promotion: int = 0) -> int:
+    files = "abcdefgh"
+    return (files.index(end[0]) | (int(end[1]) - 1) << 3 | files.index(start[0]) << 6 | (int(start[1]) - 1) << 9
+            | promotion << 12)
+
+
+def write_book(path, entries):
+    with open(path, "wb") as book_file:
+        for key, move, weight in sorted(entries):
+            book_file.write(pack(">QHHI", key, move, weight, 0))
+    return str(path)
+
+
+class TestPolyglotKey:
+    """Testing position keys against the values published with the Polyglot format."""
+
+    def test_reference_keys(self):
+        game = Chess()
+        assert polyglot_key(game) == 0x463b96181691fc9c
+        expected = [0x823c9b50fd114196, 0x0756b94461c50fb0, 0x662fafb965db29d4, 0x22a48b5a8e47ff78,
+                    0x652a607ca3f242c1, 0x00fdd303c946bdd9]
+        for move, key in zip(["e4", "d5", "e5", "f5", "Ke2", "Kf7"], expected):
+            assert game.play_move(move)[0]
+            assert polyglot_key(game) == key
+
+    def test_reference_keys_en_passant_and_castling(self):
+        game = Chess()
+        for move in ["a4", "b5", "h4", "b4", "c4"]:
+            game.play_move(move)
+        assert polyglot_key(game) == 0x3c8123ea7b067637
+        game.play_move("bxc3")
+        game.play_move("Ra3")
+        assert polyglot_key(game) == 0x5c3f9b829b279560
+
+
+class TestOpeningBook:
+    """Testing lookups in a memory mapped Polyglot book."""
+
+    def test_lookup(self, tmp_path):
+        start, after_e4 = polyglot_key(Chess()), 0x823c9b50fd114196
+        path = write_book(tmp_path / "book.bin", [
+            (start, polyglot_move("e2", "e4"), 10), (start, polyglot_move("d2", "d4"), 30),
+            (start, polyglot_move("e2", "e5"), 50), (after_e4, polyglot_move("c7", "c5"), 1), (1, 0, 1),
+        ])
+        with OpeningBook(path) as book:
+            assert len(book) == 5
+            game = Chess()
+            assert book.moves(game) == [((6, 3), (4, 3), None), ((6, 4), (4, 4), None)]
+            assert book.choose(game, Random(1)) in book.moves(game)
+            game.play_move("e4")
+            assert book.moves(game) == [((1, 2), (3, 2), None)]
+            game.play_move("c5")
+            assert book.moves(game) == [] and book.choose(game) is None
+
+    def test_castling_and_promotion(self, tmp_path):
+        castling = Chess.from_fen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        promotion = Chess.from_fen("8/P6k/8/8/8/8/8/K7 w - - 0 1")
+        path = write_book(tmp_path / "book.bin", [
+            (polyglot_key(castling), polyglot_move("e1", "h1"), 1),
+            (polyglot_key(castling), polyglot_move("e1", "a1"), 1),
+            (polyglot_key(promotion), polyglot_move("a7", "a8", 4), 1),
+        ])
+        with OpeningBook(path) as book:
+            assert sorted(book.moves(castling)) == [((7, 4), (7, 2), None), ((7, 4), (7, 6), None)]
+            assert book.moves(promotion) == [((1, 0), (0, 0), Queen)]
+
+    def test_empty_book_and_engine(self, tmp_path):
+        with OpeningBook(write_book(tmp_path / "empty.bin", [])) as book:
+            assert book.moves(Chess()) == []
+        path = write_book(tmp_path / "book.bin", [(polyglot_key(Chess()), polyglot_move("g1", "f3"), 1)])
+        with OpeningBook(path) as book:
+            result = Engine(time_budget=0.1, hash_mb=0, book=book).search(Chess())
+            assert result.move == ((7, 6), (5, 5), None) and result.depth == 0
+            assert Chess().hint(book=book) == "book moves: Nf3"
@@ -0,0 +1,66 @@
+from threading import Timer
+from time import perf_counter, sleep
+
+from pychess.engine import Engine, evaluate
+from pychess.game import Chess, Ponderer, STARTING_FEN
+
+
+class TestEngine:
+    """Testing the alpha-beta search engine."""
+
+    def test_start_position_is_balanced(self):
+        assert evaluate(Chess()) == 0
+
+    def test_finds_mate_in_one(self):
+        game = Chess.from_fen("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4")
+        result = Engine(5).search(game)
+        assert game.san(*result.move) == "Qxf7#"
+        assert game.zobrist_key == game.hash_position()
+
+    def test_wins_hanging_queen(self):
+        game = Chess.from_fen("4k3/8/8/3q4/8/2N5/8/4K3 w - - 0 1")
+        result = Engine(5, max_depth=3).search(game)
+        assert game.san(*result.move) == "Nxd5"
+        assert result.depth == 3
+
+    def test_respects_time_budget(self):
+        result = Engine(0.2).search(Chess.from_fen(STARTING_FEN))
+        assert result.move is not None
+        assert result.elapsed < 1
+        assert result.nodes_per_second > 0
+
+    def test_vs_engine_game_loop(self, monkeypatch, capsys):
+        monkeypatch.setattr("builtins.input", lambda prompt: "g4")
+        game = Chess.from_fen("rnbqkbnr/pppp1ppp/8/4p3/8/5P2/PPPPP1PP/RNBQKBNR w KQkq - 0 2")
+        game.start(engine=Engine(1, max_depth=2))
+        assert game.done and game.winner.name == "black"
+        assert "% hash hits)" in capsys.readouterr().out
+
+    def test_ponders_until_stopped(self):
+        game, ponderer = Chess(), Ponderer(Engine(hash_mb=1))
+        ponderer.start(game)
+        sleep(0.3)
+        start = perf_counter()
+        ponderer.stop(game)
+        assert perf_counter() - start < 0.2
+        result = ponderer.analysis(game)
+        assert result.depth >= 1 and result.move is not None
+        assert game.hint(pondered=result) == "engine suggests {} (depth {})".format(
+            game.san(*result.move), result.depth)
+        assert game.to_fen() == Chess().to_fen() and not game.history
+        assert not ponderer.engine.stopping.is_set()
+        assert ponderer.engine.search(game, 0.1).depth >= 1
+
+    def test_stop_from_another_thread(self):
+        engine = Engine(hash_mb=1)
+        Timer(0.2, engine.stop).start()
+        result = engine.search(Chess(), float("inf"))
+        assert result.depth >= 1 and result.move is not None and result.elapsed < 1
+        engine.resume()
+        assert engine.search(Chess(), 0.1).depth >= 1
+
+    def test_vs_engine_game_loop_pondering(self, monkeypatch):
+        monkeypatch.setattr("builtins.input", lambda prompt: sleep(0.05) or "g4")
+        game = Chess.from_fen("rnbqkbnr/pppp1ppp/8/4p3/8/5P2/PPPPP1PP/RNBQKBNR w KQkq - 0 2")
+        game.start(engine=Engine(1, max_depth=2), ponder=True)
+        assert game.done and game.winner.name == "black"
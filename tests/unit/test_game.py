@@ -0,0 +1,330 @@
+from io import StringIO
+
+import pytest
+
+from pychess.game import BLACK_BIT, PROFILER, QUEEN, Chess, Color, Knight, PotentialMoveGenerator, Ponderer, \
+    TerminalRenderer, decode_move, encode_move, square_to_coord
+
+
+def snapshot(game: Chess):
+    return {coord: (piece.name, piece.color, piece.pos, piece.moved) for coord, piece in game.board.items()}, \
+        {color: list(captures) for color, captures in game.captures.items()}, game.turn, game.halfmove_clock, \
+        list(game.piece_counts), dict(game.position_counts)
+
+
+class TestMakeUnmake:
+    """Testing that make_move/unmake_move restores the game exactly."""
+
+    def play(self, game: Chess, *moves: str):
+        for move in moves:
+            result = game.parse_move(move)
+            assert result[0], result[1]
+            game.move(*result[2:5])
+
+    def test_unmake_restores_every_legal_move(self):
+        game = Chess()
+        self.play(game, "e4", "d5", "e5", "f5", "Nf3", "Nc6", "Bc4", "Qd6")
+        before = snapshot(game)
+        for move in list(game.move_generator.get_moves(game.player_color())):
+            game.make_move(*move)
+            game.unmake_move()
+            assert snapshot(game) == before
+
+    def test_unmake_en_passant_and_castling(self):
+        game = Chess()
+        self.play(game, "e4", "a6", "e5", "d5", "Nf3", "a5", "Bc4", "a4")
+        before = snapshot(game)
+        game.make_move(square_to_coord("e5"), square_to_coord("d6"))
+        assert square_to_coord("d5") not in game.board
+        game.unmake_move()
+        assert snapshot(game) == before
+        game.make_move(square_to_coord("e1"), square_to_coord("g1"))
+        assert game.board[square_to_coord("f1")].name == "rook"
+        game.unmake_move()
+        assert snapshot(game) == before
+
+
+class TestLegality:
+    """Testing the attack query and pin/check aware move generation."""
+
+    def test_is_square_attacked(self):
+        game = Chess()
+        assert game.is_square_attacked(square_to_coord("f3"), Color.WHITE)
+        assert game.is_square_attacked(square_to_coord("d6"), Color.BLACK)
+        assert not game.is_square_attacked(square_to_coord("e4"), Color.WHITE)
+        assert not game.is_square_attacked(square_to_coord("e5"), Color.BLACK)
+
+    def test_no_castling_through_check(self):
+        game = Chess()
+        TestMakeUnmake().play(game, "e4", "b6", "Nf3", "Ba6", "Bb5", "Bxb5")
+        assert (square_to_coord("e1"), square_to_coord("g1")) not in game.move_generator.get_moves(Color.WHITE)
+        assert not game.parse_move("O-O")[0]
+
+    def test_check_evasions(self):
+        game = Chess()
+        TestMakeUnmake().play(game, "e4", "e5", "d4", "Bb4+")
+        moves = list(game.move_generator.get_moves(Color.WHITE))
+        assert (square_to_coord("c2"), square_to_coord("c3")) in moves
+        assert (square_to_coord("b1"), square_to_coord("a3")) not in moves
+
+    def test_pinned_piece_cannot_leave_line(self):
+        game = Chess()
+        TestMakeUnmake().play(game, "e4", "e5", "d3", "Bb4+", "Nd2", "a6")
+        moves = list(game.move_generator.get_moves(Color.WHITE, start_coord=square_to_coord("d2")))
+        assert moves == []
+
+
+class TestZobrist:
+    """Testing the incrementally updated Zobrist key."""
+
+    def test_incremental_key_matches_full_hash(self):
+        game = Chess()
+        for move in ["e4", "d5", "e5", "f5", "exf6", "Nc6", "Nf3", "Bg4", "Bc4", "Qd6", "O-O", "O-O-O"]:
+            result = game.parse_move(move)
+            assert result[0], result[1]
+            game.move(*result[2:5])
+            assert game.zobrist_key == game.hash_position()
+        while game.undo_stack:
+            game.unmake_move()
+            assert game.zobrist_key == game.hash_position()
+        assert game.zobrist_key == Chess().zobrist_key
+
+    def test_transposition_has_same_key(self):
+        game = Chess()
+        TestMakeUnmake().play(game, "Nf3", "Nf6", "Ng1", "Ng8")
+        assert game.zobrist_key == Chess().zobrist_key
+        TestMakeUnmake().play(game, "e4")
+        assert game.zobrist_key != Chess().zobrist_key
+
+
+class TestMoveIndex:
+    """Testing the cached per-position SAN index."""
+
+    def test_index_reused_until_position_changes(self):
+        game = Chess()
+        index = game.move_index()
+        assert game.move_index().origins[("N", square_to_coord("f3"))] == [square_to_coord("g1")]
+        for bad_move in ["Nf4", "e5", "Ke2", "e4+"]:
+            assert not game.parse_move(bad_move)[0]
+            assert game.move_index() is index
+        game.play_move("e4")
+        assert game.move_index() is not index
+
+    def test_castling_check_suffix(self):
+        game = Chess.from_fen("5k2/8/8/8/8/8/8/4K2R w K - 0 1")
+        assert game.parse_move("O-O")[5]
+        assert game.parse_move("O-O+")[0]
+        assert game.parse_move("O-O#") == (False, "not checkmate")
+
+
+class TestFen:
+    """Testing FEN import and export."""
+
+    def test_round_trip(self):
+        for fen in ["rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                    "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1"]:
+            assert Chess.from_fen(fen).to_fen() == fen
+
+    def test_fen_after_moves(self):
+        game = Chess()
+        TestMakeUnmake().play(game, "e4", "a6", "e5", "d5", "Ke2")
+        assert game.to_fen() == "rnbqkbnr/1pp1pppp/p7/3pP3/8/8/PPPPKPPP/RNBQ1BNR b kq - 1 3"
+        assert Chess.from_fen(game.to_fen()).zobrist_key == game.zobrist_key
+
+
+class TestSnapshot:
+    """Testing binary save and restore of games."""
+
+    def test_round_trip(self):
+        game = Chess()
+        TestMakeUnmake().play(game, "e4", "d5", "exd5", "c6", "dxc6", "Nf6", "cxb7", "e5", "Nc3", "e4", "d4")
+        restored = Chess.from_snapshot(game.to_snapshot())
+        assert restored.to_fen() == game.to_fen() == "rnbqkb1r/pP3ppp/5n2/8/3Pp3/2N5/PPP2PPP/R1BQKBNR b KQkq d3 0 6"
+        assert restored.zobrist_key == game.zobrist_key and restored.turn == game.turn
+        for color in [Color.WHITE, Color.BLACK]:
+            assert [str(piece) for piece in restored.captures[color]] == [str(piece) for piece in game.captures[color]]
+        assert restored.play_move("exd3")[0]
+
+    def test_history_survives(self):
+        game = Chess()
+        game.play_moves(["Nf3", "Nf6", "Ng1", "Ng8", "e4", "e5", "Ke2", "Ke7", "Ke1", "Ke8"])
+        before, data = snapshot(game), game.to_snapshot()
+        assert snapshot(game) == before and len(game.undo_stack) == 10
+        restored = Chess.from_snapshot(data)
+        assert restored.history == game.history and snapshot(restored) == snapshot(game)
+        assert not restored.undo_stack and restored.move_list() == game.move_list()
+        assert restored.play_move("Nc3")[0] and restored.takeback(5) == 5 and restored.to_fen() == Chess.from_fen(
+            "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 4").to_fen()
+        assert restored.zobrist_key == restored.hash_position() and len(restored.undo_stack) == 6
+        position = Chess.from_snapshot(game.to_snapshot(with_history=False))
+        assert position.to_fen() == game.to_fen() and not position.history
+        assert position.position_counts == game.position_counts and position.takeback() == 0
+        assert position.play_move("Nf3")[0] and position.takeback() == 1 and position.to_fen() == game.to_fen()
+        corrupt = bytearray(data)
+        corrupt[len(data) - len(game.root) - 1] ^= 0x3F  # the square the last move starts from
+        corrupt = Chess.from_snapshot(bytes(corrupt))
+        for method in [corrupt.takeback, corrupt.move_list]:
+            with pytest.raises(ValueError):
+                method()
+
+    def test_result_and_errors(self):
+        game = Chess()
+        game.play_moves(["f3", "e5", "g4", "Qh4#"])
+        restored = Chess.from_snapshot(game.to_snapshot())
+        assert restored.done and restored.winner == Color.BLACK
+        for data in [b"", b"PYCS", b"XXXX" + game.to_snapshot()[4:]]:
+            with pytest.raises(ValueError):
+                Chess.from_snapshot(data)
+
+
+class TestTerminalRenderer:
+    """Testing that frames after the first only redraw what changed."""
+
+    def test_differential_frames(self):
+        game, out = Chess(), StringIO()
+        renderer = TerminalRenderer(out)
+        renderer.draw(game, "start")
+        first = out.getvalue()
+        assert first.startswith("\033[2J") and first.count("\033[0m") == 64 + 32
+        game.play_move("e4")
+        second = renderer.render(game, "e4")
+        assert second.count("\033[0m") == 2 and "\033[6;19H" in second and "\033[8;19H" in second
+        assert len(second) * 10 < len(first)
+        game.play_move("d5")
+        game.play_move("exd5")
+        third = renderer.render(game, "exd5")
+        assert third.count("\033[0m") == 4 and "\033[2;2H" in third
+        assert renderer.render(game, "again") == "\033[11;1H\033[J again\n"
+
+
+class TestProfiler:
+    """Testing the opt-in hot path instrumentation."""
+
+    def test_counts_only_while_enabled(self):
+        original = PotentialMoveGenerator.get_moves
+        PROFILER.reset()
+        Chess().play_moves(["e4", "e5"])
+        assert all(entry["calls"] == 0 for entry in Chess.stats().values())
+        PROFILER.enable()
+        try:
+            Chess().play_moves(["f3", "e5", "g4", "Qh4#"])
+        finally:
+            PROFILER.disable()
+        stats = Chess.stats()
+        assert stats["parse_move"]["calls"] == 4 and stats["is_checkmate"]["calls"] == 4
+        assert stats["get_moves"]["calls"] > 0 and stats["parse_move"]["seconds"] > 0
+        assert PotentialMoveGenerator.get_moves is original
+        assert "parse_move" in PROFILER.summary()
+        PROFILER.reset()
+
+
+class TestPieces:
+    """Testing the slotted piece representation."""
+
+    def test_type_data_is_shared(self):
+        game = Chess()
+        pawn, knight = game.board[6, 4], game.board[7, 6]
+        assert not hasattr(pawn, "__dict__") and not hasattr(knight, "__dict__")
+        assert (pawn.name, pawn.short_name, knight.name) == ("pawn", "P", "knight")
+        assert pawn.just_moved_two_squares == -1 and not knight.moved
+
+    def test_piece_exists(self):
+        game = Chess()
+        assert game.piece_exists((6, 4), piece_class="pawn", piece_color=Color.WHITE)
+        assert not game.piece_exists((6, 4), piece_class="pawn", piece_color=Color.BLACK)
+        assert not game.piece_exists((6, 4), piece_class="knight")
+        assert game.piece_exists((0, 4), piece_class="king", specific_rank=0, specific_file=4)
+        assert not game.piece_exists((4, 4)) and not game.piece_exists((8, 4))
+
+
+class TestPlayParsed:
+    """Testing the shared path that plays a parsed move and settles the game."""
+
+    def test_checkmate(self):
+        game = Chess.from_fen("rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq g3 0 2")
+        parsed = game.parse_move("Qh4#")
+        assert parsed.checkmate and parsed.end_coord == square_to_coord("h4")
+        assert game.play_parsed(parsed).startswith("(checkmate) ") and game.done and game.winner == Color.BLACK
+
+
+class TestDraws:
+    """Testing repetition, fifty-move, insufficient material and stalemate draws."""
+
+    def test_threefold_repetition(self):
+        game = Chess()
+        summary = game.play_moves(["Nf3", "Nf6", "Ng1", "Ng8", "Nf3", "Nf6", "Ng1", "Ng8", "Nf3"])
+        assert summary.moves_played == 8 and summary.done and summary.winner is None
+        assert summary.last_message.startswith("(draw by threefold repetition)")
+        assert game.draw_reason == "threefold repetition"
+
+    def test_repetition_history_follows_unmake(self):
+        game = Chess()
+        TestMakeUnmake().play(game, "Nf3", "Nf6", "Ng1", "Ng8")
+        assert game.position_counts[game.zobrist_key] == 2
+        game.unmake_move()
+        assert game.position_counts[Chess().zobrist_key] == 1
+
+    def test_fifty_move_rule(self):
+        game = Chess.from_fen("4k3/8/8/8/8/8/4P3/R3K3 w - - 99 80")
+        assert game.play_move("Ra2")[1].startswith("(draw by fifty-move rule)") and game.done
+        game = Chess.from_fen("4k3/8/8/8/8/8/4P3/R3K3 w - - 99 80")
+        assert not game.play_move("e4")[1].startswith("(draw") and game.halfmove_clock == 0
+
+    def test_insufficient_material(self):
+        game = Chess.from_fen("4k3/8/8/8/8/8/3q4/4KN2 w - - 0 1")
+        assert game.piece_counts[QUEEN | BLACK_BIT] == 1 and game.piece_counts[0] == 0
+        msg = game.play_move("Kxd2")[1]
+        assert game.piece_counts[0] == 0 and sum(game.piece_counts) == 3
+        assert msg.startswith("(draw by insufficient material)") and game.winner is None
+        game = Chess.from_fen("4k3/8/8/8/8/8/3q4/4KNN1 w - - 0 1")
+        game.play_move("Kxd2")
+        assert not game.done
+
+    def test_stalemate(self):
+        game = Chess.from_fen("7k/8/5K2/6Q1/8/8/8/8 w - - 0 1")
+        assert game.play_move("Qg6")[1].startswith("(draw by stalemate)")
+        assert game.done and game.winner is None
+
+
+class TestMoveHistory:
+    """Testing 16-bit move encoding, the history array and takebacks."""
+
+    def test_encoding(self):
+        move = (square_to_coord("b7"), square_to_coord("a8"), Knight)
+        assert decode_move(encode_move(*move)) == move
+        assert encode_move(square_to_coord("a8"), square_to_coord("h1")) == 63 << 6
+        game = Chess.from_fen("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1")
+        encoded = [decode_move(move) for move in game.move_generator.get_encoded_moves(Color.WHITE)]
+        assert encoded == list(game.move_generator.get_moves_with_promotions(Color.WHITE))
+
+    def test_history_and_move_list(self):
+        game = Chess()
+        game.play_moves(["e4", "e5", "Nf3", "Nc6", "Bb5", "a6"])
+        assert game.history.typecode == "H" and game.history.itemsize == 2 and len(game.history) == 6
+        assert game.move_list() == "1. e4 e5 2. Nf3 Nc6 3. Bb5 a6"
+        assert len(game.history) == 6 and game.to_fen().endswith("w KQkq - 0 4")
+        assert Chess.from_fen("4k3/8/8/8/8/8/8/4K2R b K - 0 10").move_list() == ""
+
+    def test_takeback(self):
+        game = Chess()
+        game.play_moves(["f3", "e5", "g4", "Qh4#"])
+        assert game.done
+        assert game.takeback() == 1 and not game.done and game.winner is None
+        assert game.to_fen() == "rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq - 0 2"
+        assert game.takeback(10) == 3 and game.to_fen() == Chess().to_fen() and game.takeback() == 0
+
+
+class TestPonderer:
+    """Testing the analysis worked out while waiting for input."""
+
+    def test_move_index_is_handed_over(self):
+        game, ponderer = Chess.from_fen("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1"), Ponderer()
+        ponderer.start(game)
+        ponderer.thread.join()
+        ponderer.stop(game)
+        assert ponderer.replies == len(list(game.move_generator.get_moves_with_promotions(Color.WHITE)))
+        assert game.move_index() is ponderer.move_index and ponderer.analysis(game) is None
+        assert game.play_move("Kh1")[0] and game.move_index() is not ponderer.move_index
+        ponderer.stop(game)
+        assert game.move_index() is not ponderer.move_index
@@ -0,0 +1,37 @@
+from pychess.engine import Engine
+from pychess.game import Chess
+from pychess.parallel import ParallelEngine, _root_game, benchmark
+
+SCHOLARS_MATE = "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4"
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+class TestParallelEngine:
+    """Testing the root splitting multiprocess search."""
+
+    def test_finds_mate_in_one(self):
+        game = Chess.from_fen(SCHOLARS_MATE)
+        with ParallelEngine(2, time_budget=10, max_depth=3, hash_mb=1) as engine:
+            result = engine.search(game)
+        assert game.san(*result.move) == "Qxf7#"
+        assert result.nodes > 0
+
+    def test_benchmark_reports_speedup_over_serial(self):
+        timings = benchmark(SCHOLARS_MATE, 1, [1, 2])
+        assert [workers for workers, _, _, _ in timings] == [0, 1, 2]
+        assert timings[0][3] == 1.0
+
+    def test_searches_about_as_many_nodes_as_serial(self):
+        game = Chess.from_fen(KIWIPETE)
+        serial = Engine(float("inf"), 3, hash_mb=1).search(game)
+        with ParallelEngine(2, time_budget=float("inf"), max_depth=3, hash_mb=1) as engine:
+            result = engine.search(game)
+        assert result.nodes <= 2 * serial.nodes
+        assert (result.move, result.score) == (serial.move, serial.score)
+
+    def test_workers_get_the_position_and_its_repetitions(self):
+        game = Chess()
+        game.play_moves(["Nf3", "Nf6", "Ng1", "Ng8"] * 2 + ["e4"])
+        root = _root_game(game.to_snapshot(with_history=False))
+        assert root.to_fen() == game.to_fen() and not root.history
+        assert root.position_counts == game.position_counts
@@ -0,0 +1,25 @@
+import pytest
+
+from pychess.game import Chess, STARTING_FEN
+from pychess.perft import PERFT_SUITE, divide, perft, run_suite
+
+
+class TestPerft:
+    """Testing move generator node counts against known perft results."""
+
+    @pytest.mark.parametrize("position", PERFT_SUITE, ids=[position.name for position in PERFT_SUITE])
+    def test_suite_position(self, position):
+        for depth, expected in enumerate(position.counts, 1):
+            if expected > 3000:
+                break
+            assert perft(Chess.from_fen(position.fen), depth) == expected
+
+    def test_divide_sums_to_perft(self):
+        results = divide(Chess.from_fen(STARTING_FEN), 2)
+        assert len(results) == 20
+        assert results["e2e4"] == 20
+        assert sum(results.values()) == 400
+
+    def test_run_suite_reports(self, capsys):
+        assert run_suite(max_depth=1)
+        assert "nodes/s" in capsys.readouterr().out
@@ -0,0 +1,35 @@
+import io
+
+from pychess.pgn import parse_games, read_games, replay
+
+TEST_RESOURCES = "tests/resources"
+
+
+class TestPgn:
+    """Testing the streaming PGN reader."""
+
+    def test_read_games(self):
+        games = list(read_games(f"{TEST_RESOURCES}/games.pgn"))
+        assert len(games) == 4
+        assert games[0].tags["Event"] == "Fool's mate"
+        assert games[0].moves == ["f3", "e5", "g4", "Qh4#"]
+        assert games[1].tags["White"] == 'A "quoted" name'
+        assert games[1].moves == ["e4", "e5", "Bc4", "Nc6", "Qh5", "Nf6", "Qxf7#"]
+        assert [game.result for game in games] == ["0-1", "1-0", "1-0", "*"]
+
+    def test_games_are_lazy(self):
+        lines = iter(['[Event "a"]\n', "1. e4 e5 *\n", '[Event "b"]\n', "1. d4 0-0 *\n"])
+        games = parse_games(lines)
+        assert next(games).moves == ["e4", "e5"]
+        assert next(lines) == '[Event "b"]\n'
+
+    def test_missing_result_and_castling_zeros(self):
+        (game,) = read_games(io.StringIO("1. e4 e5 2. Nf3 Nf6 3. Bc4 Bc5 4. 0-0 0-0\n"))
+        assert game.moves[-2:] == ["O-O", "O-O"]
+        assert game.result == "*"
+        assert replay(game).errors == []
+
+    def test_replay_from_fen_tag(self):
+        (game,) = read_games(io.StringIO('[FEN "4k3/8/4K3/8/8/8/8/7R w - - 0 1"]\n\n1. Rh8# 1-0\n'))
+        summary = replay(game)
+        assert summary.done and summary.winner.name == "white"
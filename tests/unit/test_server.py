@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from pychess.game import Chess
+from pychess.server import GameServer, load_test, random_game
+
+
+async def exchange(writer, reader, line: str) -> dict:
+    writer.write((line + "\n").encode())
+    return json.loads(await reader.readline())
+
+
+async def play_session(workers: int):
+    game_server = GameServer(workers)
+    server = await game_server.serve("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        greeting = json.loads(await reader.readline())
+        responses = [await exchange(writer, reader, move) for move in ["f3", "e5", "e5", "g4", "Qh4#", "a3"]]
+        responses.append(await exchange(writer, reader, "new 4k3/8/8/8/8/8/8/4K3 b - - 0 1"))
+        writer.write(b"quit\n")
+        report = await load_test("127.0.0.1", port, clients=4, games=1)
+        return greeting, responses, report, game_server.moves
+    finally:
+        server.close()
+        await server.wait_closed()
+        game_server.close()
+
+
+async def repetition_session(workers: int) -> list:
+    game_server = GameServer(workers)
+    server = await game_server.serve("127.0.0.1", 0)
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        await reader.readline()
+        responses = [await exchange(writer, reader, move) for move in ["Nf3", "Nf6", "Ng1", "Ng8"] * 2]
+        writer.write(b"quit\n")
+        return responses
+    finally:
+        server.close()
+        await server.wait_closed()
+        game_server.close()
+
+
+class TestGameServer:
+    """Testing the TCP line protocol and the load generator."""
+
+    def test_protocol(self):
+        greeting, responses, report, moves = asyncio.run(play_session(0))
+        assert greeting["fen"] == Chess().to_fen()
+        assert [response["ok"] for response in responses] == [True, True, False, True, True, False, True]
+        assert responses[4]["done"] and responses[4]["winner"] == "black"
+        assert responses[4]["message"].startswith("(checkmate)")
+        assert responses[5]["message"] == "game is over"
+        assert responses[6]["fen"] == "4k3/8/8/8/8/8/8/4K3 b - - 0 1"
+        assert report.errors == 0 and report.moves == len(report.latencies) > 0
+        assert moves == 4 + report.moves
+        assert report.percentile(0.99) >= report.percentile(0.5) > 0
+
+    def test_worker_processes(self):
+        _, responses, report, _ = asyncio.run(play_session(1))
+        assert responses[4]["winner"] == "black" and report.errors == 0
+
+    def test_random_game_is_legal(self):
+        summary = Chess().play_moves(random_game(7))
+        assert summary.errors == [] and summary.moves_played > 0
+
+    def test_repetition_with_worker_processes(self):
+        for workers in [0, 1]:
+            responses = asyncio.run(repetition_session(workers))
+            assert all(response["ok"] for response in responses)
+            assert responses[-1]["done"] and responses[-1]["winner"] is None
+            assert responses[-1]["message"].startswith("(draw by threefold repetition)")
+            assert not responses[-2]["done"]
@@ -0,0 +1,57 @@
+from io import StringIO
+
+import pytest
+
+from pychess.engine import MATE_SCORE, Engine
+from pychess.game import Chess
+from pychess.tablebase import MATERIALS, Tablebase, TablebaseResult, generate_tables
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("tables"))
+    out = StringIO()
+    timings = generate_tables(directory, out=out)
+    assert set(timings) == set(MATERIALS) and "positions/s" in out.getvalue()
+    with Tablebase(directory) as tablebase:
+        yield tablebase
+
+
+class TestTablebase:
+    """Testing the retrograde endgame tables."""
+
+    def test_longest_mates(self, tables):
+        # the longest wins are 10 moves in KQK, 16 in KRK and 28 in KPK
+        for material, plies in [("KQK", 19), ("KRK", 31), ("KPK", 55)]:
+            values = tables.table(material)[8:]
+            assert max(value for value in values if value < 0x80) == plies
+
+    def test_probe(self, tables):
+        assert tables.probe(Chess.from_fen("7k/8/6Q1/8/8/8/8/K7 b - - 0 1")) == TablebaseResult(0, 0)
+        assert tables.probe(Chess.from_fen("6k1/8/6K1/8/8/8/8/R7 w - - 0 1")) == TablebaseResult(1, 1)
+        assert tables.probe(Chess.from_fen("R5k1/8/6K1/8/8/8/8/8 b - - 0 1")) == TablebaseResult(-1, 0)
+        assert tables.probe(Chess.from_fen("4k3/4P3/4K3/8/8/8/8/8 b - - 0 1")) == TablebaseResult(0, 0)
+        assert tables.probe(Chess.from_fen("4k3/4P3/4K3/8/8/8/8/8 w - - 0 1")).wdl == 1
+        assert tables.probe(Chess.from_fen("8/8/8/8/8/4k3/4p3/4K3 b - - 0 1")).wdl == 1
+        assert tables.probe(Chess.from_fen("8/8/8/8/8/8/3kp3/6K1 w - - 0 1")).wdl == -1
+        assert tables.probe(Chess.from_fen("4k3/8/8/8/8/8/8/4K3 w - - 0 1")) == TablebaseResult(0, 0)
+        assert tables.probe(Chess.from_fen("4k3/8/8/8/8/8/8/1N2K3 w - - 0 1")) is None
+        assert tables.probe(Chess()) is None
+
+    def test_symmetric_positions_agree(self, tables):
+        assert tables.probe(Chess.from_fen("8/8/8/2k5/8/8/8/R3K3 w - - 0 1")) == \
+            tables.probe(Chess.from_fen("3k3r/8/8/8/5K2/8/8/8 b - - 0 1"))
+
+    def test_best_move_mates(self, tables):
+        game = Chess.from_fen("8/8/8/3k4/8/8/8/R3K3 w - - 0 1")
+        plies = tables.probe(game).distance
+        for _ in range(plies):
+            game.make_move(*tables.best_move(game))
+        assert game.is_checkmate(game.player_color())
+
+    def test_engine_and_hint(self, tables):
+        game = Chess.from_fen("6k1/8/6K1/8/8/8/8/R7 w - - 0 1")
+        result = Engine(hash_mb=0, tablebase=tables).search(game)
+        assert result.source == "tablebase" and result.score == MATE_SCORE - 1
+        assert game.san(*result.move) == "Ra8#"
+        assert game.hint(tablebase=tables) == "tablebase: mate in 1, play Ra8#"
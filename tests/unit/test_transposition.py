@@ -0,0 +1,48 @@
+from pychess.game import Chess, Queen
+from pychess.transposition import ENTRY_BYTES, EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable, pack_move, \
+    unpack_move
+
+
+class TestTranspositionTable:
+    """Testing the fixed size transposition table."""
+
+    def test_size_in_megabytes(self):
+        table = TranspositionTable(1)
+        assert table.buckets * 2 * ENTRY_BYTES == 1024 * 1024
+        assert len(table.keys) == table.buckets * 2
+
+    def test_pack_move_round_trip(self):
+        for move in [((6, 4), (4, 4), None), ((1, 0), (0, 1), Queen), ((0, 0), (7, 7), None)]:
+            assert unpack_move(pack_move(move)) == move
+        assert pack_move(None) == 0 and unpack_move(0) is None
+
+    def test_store_and_probe(self):
+        table = TranspositionTable(0.01)
+        key = Chess().zobrist_key
+        assert table.probe(key) is None
+        table.store(key, 3, 25, EXACT, ((6, 4), (4, 4), None))
+        entry = table.probe(key)
+        assert (entry.depth, entry.score, entry.bound, entry.move) == (3, 25, EXACT, ((6, 4), (4, 4), None))
+        assert table.hit_rate == 0.5
+
+    def test_depth_preferred_and_always_replace(self):
+        table = TranspositionTable(0.001)
+        deep, shallow, newer = 5, 5 + table.buckets, 5 + 2 * table.buckets
+        table.store(deep, 6, 1, LOWER_BOUND, None)
+        table.store(shallow, 2, 2, UPPER_BOUND, None)
+        table.store(newer, 1, 3, EXACT, None)
+        assert table.probe(deep).score == 1
+        assert table.probe(shallow) is None
+        assert table.probe(newer).score == 3
+        table.store(newer, 8, 4, EXACT, None)
+        assert table.probe(newer).score == 4
+        assert table.probe(deep) is None
+
+    def test_shallow_result_keeps_deep_entry(self):
+        table = TranspositionTable(0.001)
+        table.store(7, 6, 1, LOWER_BOUND, None)
+        table.store(7, 2, 2, UPPER_BOUND, None)
+        assert table.probe(7).depth == 6 and table.probe(7).score == 1
+        assert table.keys[7 % table.buckets * 2 + 1] == 7
+        table.store(7, 3, 3, EXACT, None)
+        assert table.probe(7).depth == 3 and table.probe(7).score == 3